@@ -0,0 +1,251 @@
+# batch.py - Headless batch runner for large URL lists
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import JsonlSink, metrics
+from pipeline import DEFAULT_SENDER, fetch_page, extract_jobs, retrieve_links, write_job_emails
+
+_DONE = object()
+
+
+def load_completed_urls(output_path):
+    """Return the URLs that already have a successful record in the output file"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-write can leave a truncated last line
+                continue
+            if record.get("status") == "ok":
+                done.add(record.get("url"))
+    return done
+
+
+def trim_partial_line(output_path):
+    """Cut a truncated last record off the output file so appends start on a new line"""
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the last complete line; the cut-off record is unreadable anyway
+        end = size
+        while end > 0:
+            start = max(0, end - 64 * 1024)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            end = start
+        f.truncate(0)
+
+
+class BatchRunner:
+    """Run fetch -> extract -> write over many URLs with a concurrency limit per stage.
+
+    Results are appended to a JSONL file as soon as each URL finishes, one
+    record per URL. Rerunning with the same output file skips URLs that
+    already have an ``"ok"`` record, so a crashed run picks up where it
+    stopped; URLs that errored are retried.
+
+    Each page's chunks and email batches are sent one at a time, so a
+    stage never has more LLM calls in flight than its concurrency limit.
+    """
+
+    def __init__(self, chain, portfolio, output_path, fetch_concurrency=16,
+                 extract_concurrency=4, write_concurrency=4, sender=None, job_index=None):
+        self.chain = chain
+        self.portfolio = portfolio
+        self.output_path = output_path
+        self.fetch_concurrency = fetch_concurrency
+        self.extract_concurrency = extract_concurrency
+        self.write_concurrency = write_concurrency
+        self.sender = {**DEFAULT_SENDER, **(sender or {})}
+        self.job_index = job_index
+        self.stats = {"ok": 0, "error": 0, "skipped": 0, "jobs": 0}
+
+    async def run(self, urls):
+        """Process ``urls`` and return the run statistics"""
+        done = load_completed_urls(self.output_path)
+        pending = []
+        seen = set()
+        for url in urls:
+            url = url.strip()
+            if not url or url in seen:
+                continue
+            seen.add(url)
+            if url in done:
+                self.stats["skipped"] += 1
+            else:
+                pending.append(url)
+
+        if not pending:
+            return self.stats
+
+        self.portfolio.load_portfolio()
+
+        self._loop = asyncio.get_running_loop()
+        workers = self.fetch_concurrency + self.extract_concurrency + self.write_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._write_lock = asyncio.Lock()
+        self._tasks = []
+        self._started = {}
+
+        # Bounded queues give backpressure: a fast fetch stage can't pile up
+        # thousands of pages waiting on the slower LLM stages
+        url_queue = asyncio.Queue()
+        extract_queue = asyncio.Queue(maxsize=self.extract_concurrency * 2)
+        write_queue = asyncio.Queue(maxsize=self.write_concurrency * 2)
+        for url in pending:
+            url_queue.put_nowait((url, None))
+        for _ in range(self.fetch_concurrency):
+            url_queue.put_nowait(_DONE)
+
+        try:
+            trim_partial_line(self.output_path)
+            with open(self.output_path, "a", encoding="utf-8") as out:
+                self._out = out
+                self._start_stage(self.fetch_concurrency, url_queue, self._fetch,
+                                  extract_queue, self.extract_concurrency)
+                self._start_stage(self.extract_concurrency, extract_queue, self._extract,
+                                  write_queue, self.write_concurrency)
+                self._start_stage(self.write_concurrency, write_queue, self._write)
+                await asyncio.gather(*self._tasks)
+        finally:
+            self._executor.shutdown(wait=False)
+        return self.stats
+
+    def _start_stage(self, n, in_queue, handler, out_queue=None, next_workers=0):
+        """Start ``n`` workers that feed ``in_queue`` items through ``handler``.
+
+        When the last worker of a stage sees the end marker it passes one end
+        marker per worker on to the next stage.
+        """
+        remaining = [n]
+
+        async def worker():
+            while True:
+                item = await in_queue.get()
+                if item is _DONE:
+                    remaining[0] -= 1
+                    if remaining[0] == 0 and out_queue is not None:
+                        for _ in range(next_workers):
+                            await out_queue.put(_DONE)
+                    return
+                url, payload = item
+                try:
+                    with metrics.job(url):
+                        result = await handler(url, payload)
+                except Exception as e:
+                    await self._emit({"url": url, "status": "error", "error": str(e)})
+                    continue
+                if result is not None and out_queue is not None:
+                    await out_queue.put((url, result))
+
+        self._tasks.extend(asyncio.create_task(worker()) for _ in range(n))
+
+    def _call(self, fn, *args, **kwargs):
+        # Carry the current job over to the worker thread for instrumentation
+        context = contextvars.copy_context()
+        return self._loop.run_in_executor(self._executor, context.run, functools.partial(fn, *args, **kwargs))
+
+    async def _fetch(self, url, _):
+        self._started[url] = time.perf_counter()
+        page_html, text = await self._call(fetch_page, url)
+        if not text:
+            await self._emit({"url": url, "status": "error", "error": "Could not load content from the URL"})
+            return None
+        return page_html, text
+
+    async def _extract(self, url, page):
+        jobs = await self._call(extract_jobs, self.chain, *page, url, max_workers=1)
+        if not jobs:
+            await self._emit({"url": url, "status": "ok", "jobs": []})
+            return None
+        return jobs
+
+    async def _write(self, url, jobs):
+        links_per_job = await self._call(retrieve_links, self.portfolio, jobs)
+        results = await self._call(write_job_emails, self.chain, jobs, links_per_job, self.sender, self.job_index,
+                                   max_workers=1)
+        await self._emit({"url": url, "status": "ok", "jobs": results})
+
+    async def _emit(self, record):
+        record["finished_at"] = time.time()
+        started = self._started.pop(record["url"], None)
+        if started is not None:
+            record["seconds"] = round(time.perf_counter() - started, 4)
+        async with self._write_lock:
+            self._out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._out.flush()
+            self.stats[record["status"]] += 1
+            self.stats["jobs"] += len(record.get("jobs", []))
+
+
+def read_urls(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate cold emails for a file of job URLs")
+    parser.add_argument("urls", help="Text file with one job URL per line")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL output file (appended to, resumable)")
+    parser.add_argument("--fetch-concurrency", type=int, default=16)
+    parser.add_argument("--extract-concurrency", type=int, default=4)
+    parser.add_argument("--write-concurrency", type=int, default=4)
+    parser.add_argument("--name", default=DEFAULT_SENDER["person_name"])
+    parser.add_argument("--company", default=DEFAULT_SENDER["company_name"])
+    parser.add_argument("--role", default=DEFAULT_SENDER["person_role"])
+    parser.add_argument("--no-reuse", action="store_true",
+                        help="Always write new emails, even for near-duplicates of jobs seen before")
+    parser.add_argument("--metrics-jsonl", help="Append per-stage metric events to this JSONL file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port during the run")
+    args = parser.parse_args(argv)
+
+    if args.metrics_jsonl:
+        metrics.add_sink(JsonlSink(args.metrics_jsonl))
+    if args.metrics_port:
+        metrics.serve_prometheus(args.metrics_port)
+
+    from chains import Chain
+    from portfolio import Portfolio
+    from resources import get_job_index
+
+    runner = BatchRunner(
+        Chain(),
+        Portfolio(),
+        args.output,
+        fetch_concurrency=args.fetch_concurrency,
+        extract_concurrency=args.extract_concurrency,
+        write_concurrency=args.write_concurrency,
+        sender={"person_name": args.name, "company_name": args.company, "person_role": args.role},
+        job_index=None if args.no_reuse else get_job_index(),
+    )
+    start = time.perf_counter()
+    stats = asyncio.run(runner.run(read_urls(args.urls)))
+    elapsed = time.perf_counter() - start
+    print(f"✅ Done in {elapsed:.1f}s: {stats['ok']} ok, {stats['error']} errors, "
+          f"{stats['skipped']} skipped (already done), {stats['jobs']} emails")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# bench_clean.py - Micro-benchmark for the page text cleaner
+#
+# Usage:
+#   python bench_clean.py                 # synthetic career pages
+#   python bench_clean.py saved_pages/    # every *.html file in a folder
+import argparse
+import glob
+import os
+import random
+import re
+import time
+
+from helpers import clean_text, clean_html
+
+WINDOW = 4000
+
+BOILERPLATE_WORDS = ("home about products pricing blog login signup contact support privacy terms "
+                     "cookies accept settings newsletter subscribe follow twitter linkedin").split()
+JOB_WORDS = ("engineer developer python django react sql kubernetes docker aws machine learning "
+             "senior junior years experience remote hybrid salary requirements responsibilities").split()
+
+
+def legacy_clean_text(text):
+    """The original five-pass cleaner, kept here as the baseline"""
+    text = re.sub(r'<[^>]*?>', '', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    text = text.strip()
+    text = ' '.join(text.split())
+    return text
+
+
+def synthetic_page(rng, jobs=40):
+    """A career page with heavy menus, scripts and footers around the postings"""
+    def words(vocab, n):
+        return " ".join(rng.choice(vocab) for _ in range(n))
+
+    menu = "".join(f'<li><a href="https://example.com/{w}">{w.title()}</a></li>' for w in BOILERPLATE_WORDS)
+    parts = [
+        "<html><head><title>Careers</title>",
+        "<style>" + ".x{color:red}" * 400 + "</style>",
+        "<script>" + "var analytics = {track: function(){}};" * 300 + "</script></head><body>",
+        f"<header><nav><ul>{menu * 5}</ul></nav></header>",
+        f'<div class="cookie-banner">{words(BOILERPLATE_WORDS, 120)}</div>',
+        f"<aside>{words(BOILERPLATE_WORDS, 400)}</aside>",
+        '<div class="content">',
+    ]
+    for i in range(jobs):
+        parts.append(
+            f'<div class="job-card" id="job-{i}"><h3>{words(JOB_WORDS, 3)}</h3>'
+            f"<p>{words(JOB_WORDS, 80)}</p><ul><li>{words(JOB_WORDS, 10)}</li></ul></div>"
+        )
+    parts.append(f"</div><footer>{words(BOILERPLATE_WORDS, 300)}{menu * 3}</footer>")
+    parts.append("<script>" + "window.dataLayer.push({});" * 300 + "</script></body></html>")
+    return "".join(parts)
+
+
+def job_share(text):
+    """Fraction of words in the LLM window that are job text rather than boilerplate"""
+    window = text[:WINDOW].lower().split()
+    if not window:
+        return 0.0
+    job_vocab = set(JOB_WORDS)
+    return sum(1 for w in window if w in job_vocab) / len(window)
+
+
+def bench(fn, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark helpers.clean_text / clean_html")
+    parser.add_argument("pages", nargs="?", help="Folder of saved *.html pages (default: synthetic)")
+    parser.add_argument("--count", type=int, default=20, help="Synthetic pages to generate")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.pages, "*.html"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        if not pages:
+            raise SystemExit(f"No *.html files in {args.pages}")
+    else:
+        rng = random.Random(0)
+        pages = [synthetic_page(rng) for _ in range(args.count)]
+
+    total_mb = sum(len(p) for p in pages) / 1e6
+    print(f"📄 {len(pages)} pages, {total_mb:.1f} MB of HTML\n")
+
+    results = [
+        ("legacy clean_text", legacy_clean_text),
+        ("clean_text", clean_text),
+        ("clean_html", clean_html),
+    ]
+    print(f"{'cleaner':<20}{'time (s)':>10}{'MB/s':>10}{'job share of window':>22}")
+    for name, fn in results:
+        elapsed = bench(fn, pages, args.repeat)
+        share = sum(job_share(fn(p)) for p in pages) / len(pages)
+        print(f"{name:<20}{elapsed:>10.3f}{total_mb / elapsed:>10.1f}{share:>21.0%}")
+
+    if not args.pages:
+        print("\n(job share is only meaningful for synthetic pages, whose vocabulary is known)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# bench_pipeline.py - Offline end-to-end throughput benchmark
+#
+# Serves career pages from a local HTTP server, swaps ChatGroq for
+# fake_llm.FakeChatModel and runs the full fetch -> clean -> extract ->
+# retrieve -> write pipeline through BatchRunner at several concurrency
+# levels and portfolio sizes. Portfolio skills are embedded with
+# embeddings.HashEmbeddingFunction rather than a downloaded model, so no
+# API key or internet access is needed.
+#
+# Usage:
+#   python bench_pipeline.py
+#   python bench_pipeline.py --urls 200 --concurrency 1,4,16 --portfolio-sizes 20,2000 --latency 0.3
+#   python bench_pipeline.py --pages saved_pages/      # serve real saved *.html pages instead
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROLES = ["Python Developer", "Data Engineer", "Frontend Engineer", "ML Engineer", "DevOps Engineer",
+         "Android Developer", "iOS Developer", "QA Engineer", "Backend Engineer", "Full Stack Developer"]
+SKILLS = ["Python", "Django", "SQL", "React", "TypeScript", "Docker", "Kubernetes", "AWS", "Kotlin",
+          "Swift", "TensorFlow", "Java", "Spring", "PostgreSQL", "MongoDB", "Node.js", "Angular"]
+
+
+def make_page(rng, index, jobs, jsonld=False):
+    """A career page with ``jobs`` postings wrapped in typical menus and scripts"""
+    postings = []
+    blocks = []
+    for j in range(jobs):
+        role = f"{rng.choice(['Senior', 'Junior', 'Lead'])} {rng.choice(ROLES)} {index}-{j}"
+        skills = rng.sample(SKILLS, 3)
+        years = rng.randint(1, 8)
+        description = f"Build and run production systems for team {index} {j} with a focus on quality"
+        postings.append((role, skills, years, description))
+        blocks.append(
+            f'<div class="job-card"><h3>Position {role}</h3><p>Skills {" ".join(skills)}</p>'
+            f"<p>Experience {years} years</p><p>Description {description}</p><a>Apply now</a></div>"
+        )
+    ld = ""
+    if jsonld:
+        ld = "".join(
+            '<script type="application/ld+json">' + json.dumps({
+                "@context": "https://schema.org", "@type": "JobPosting", "title": role,
+                "description": description, "skills": ", ".join(skills),
+                "experienceRequirements": {"monthsOfExperience": years * 12},
+            }) + "</script>"
+            for role, skills, years, description in postings
+        )
+    menu = "".join(f"<li><a href='/{w}'>{w}</a></li>" for w in ["Home", "About", "Blog", "Contact"] * 10)
+    return (
+        f"<html><head><title>Careers {index}</title>{ld}<script>{'track();' * 200}</script></head>"
+        f"<body><header><nav><ul>{menu}</ul></nav></header><main>{''.join(blocks)}</main>"
+        f"<footer>{'Copyright ' * 100}</footer></body></html>"
+    )
+
+
+def serve_pages(pages):
+    """Serve ``{path: html}`` on a free localhost port; returns (server, base_url)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_portfolio(path, size, rng):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Techstack", "Links"])
+        for i in range(size):
+            writer.writerow([", ".join(rng.sample(SKILLS, 3)), f"https://example.com/portfolio/{i}"])
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def run_once(chain, portfolio, urls, concurrency, workdir):
+    from batch import BatchRunner
+
+    output = os.path.join(workdir, f"out_{time.time_ns()}.jsonl")
+    runner = BatchRunner(
+        chain, portfolio, output,
+        fetch_concurrency=concurrency * 2,
+        extract_concurrency=concurrency,
+        write_concurrency=concurrency,
+    )
+    start = time.perf_counter()
+    stats = asyncio.run(runner.run(urls))
+    elapsed = time.perf_counter() - start
+
+    with open(output, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    latencies = [r["seconds"] for r in records if r.get("status") == "ok" and "seconds" in r]
+    return {
+        "elapsed": elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "jobs_per_sec": stats["jobs"] / elapsed if elapsed else 0.0,
+        "urls_per_sec": stats["ok"] / elapsed if elapsed else 0.0,
+        "errors": stats["error"],
+        "jobs": stats["jobs"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--urls", type=int, default=100, help="Synthetic pages to serve")
+    parser.add_argument("--jobs-per-page", type=int, default=5)
+    parser.add_argument("--jsonld-share", type=float, default=0.0,
+                        help="Fraction of synthetic pages that embed JobPosting JSON-LD")
+    parser.add_argument("--pages", help="Serve saved *.html pages from this folder instead")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated LLM stage concurrency levels")
+    parser.add_argument("--portfolio-sizes", default="20,1000", help="Comma-separated portfolio row counts")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM seconds per call")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=os.getenv("PORTFOLIO_BACKEND", "chroma"),
+                        help="Portfolio vector store")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from chains import Chain
+    from embedding_cache import EmbeddingCache
+    from embeddings import HashEmbeddingFunction
+    from fake_llm import FakeChatModel
+    from portfolio import Portfolio
+
+    # Every run should fetch and extract for real, not replay the page cache
+    os.environ["PAGE_CACHE_PATH"] = ""
+    rng = random.Random(args.seed)
+    if args.pages:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(args.pages, "*.html"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages["/" + os.path.basename(path)] = f.read()
+        if not pages:
+            raise SystemExit(f"No *.html files in {args.pages}")
+    else:
+        pages = {
+            f"/careers/{i}.html": make_page(rng, i, args.jobs_per_page, jsonld=rng.random() < args.jsonld_share)
+            for i in range(args.urls)
+        }
+
+    server, base_url = serve_pages(pages)
+    urls = [base_url + path for path in pages]
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    sizes = [int(s) for s in args.portfolio_sizes.split(",")]
+
+    print(f"🧪 {len(urls)} pages on {base_url}, fake LLM latency {args.latency}s, {args.backend} portfolio\n")
+    header = f"{'portfolio':>10}{'conc':>6}{'wall (s)':>10}{'p50 (s)':>9}{'p95 (s)':>9}{'jobs/s':>9}{'urls/s':>9}{'errors':>8}"
+    print(header)
+    print("-" * len(header))
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in sizes:
+                csv_path = os.path.join(workdir, f"portfolio_{size}.csv")
+                make_portfolio(csv_path, size, rng)
+                portfolio = Portfolio(
+                    csv_path=csv_path,
+                    vectorstore_path=os.path.join(workdir, f"vs_{size}"),
+                    embedding_cache=EmbeddingCache(os.path.join(workdir, f"embeddings_{size}.sqlite3")),
+                    backend=args.backend,
+                    embedding_function=HashEmbeddingFunction(),
+                )
+                portfolio.load_portfolio()
+                portfolio.warm_up()
+
+                for concurrency in concurrencies:
+                    chain = Chain(cache=False, llm=FakeChatModel(latency=args.latency))
+                    result = run_once(chain, portfolio, urls, concurrency, workdir)
+                    print(f"{size:>10}{concurrency:>6}{result['elapsed']:>10.2f}{result['p50']:>9.2f}"
+                          f"{result['p95']:>9.2f}{result['jobs_per_sec']:>9.1f}{result['urls_per_sec']:>9.1f}"
+                          f"{result['errors']:>8}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
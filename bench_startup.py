@@ -0,0 +1,79 @@
+# bench_startup.py - How much does a Streamlit rerun pay for initialization?
+#
+# Usage:
+#   python bench_startup.py [--reruns 20]
+#
+# Compares building Chain + Portfolio from scratch (what every rerun used to
+# do) with fetching the process-wide instances from resources.py, and, when
+# streamlit.testing is available, times real reruns of main.py triggered by
+# typing into a sidebar field.
+import argparse
+import os
+import statistics
+import sys
+import time
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_direct(reruns):
+    import resources
+
+    start = time.perf_counter()
+    from chains import Chain
+    from portfolio import Portfolio
+    import_time = time.perf_counter() - start
+
+    def build():
+        Portfolio().load_portfolio()
+        Chain()
+
+    cold = [timed(build) for _ in range(3)]
+    resources.reset()
+    first = timed(lambda: (resources.get_chain(), resources.get_portfolio()))
+    warm = [timed(lambda: (resources.get_chain(), resources.get_portfolio())) for _ in range(reruns)]
+
+    print(f"{'heavy imports (once)':<34}{import_time * 1000:>10.1f} ms")
+    print(f"{'build Chain + Portfolio':<34}{statistics.median(cold) * 1000:>10.1f} ms  (old per-rerun cost)")
+    print(f"{'resources, first call':<34}{first * 1000:>10.1f} ms")
+    print(f"{'resources, cached call':<34}{statistics.median(warm) * 1000:>10.3f} ms  (new per-rerun cost)")
+
+
+def bench_apptest(reruns):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("\n(streamlit.testing not available, skipping full-rerun benchmark)")
+        return
+
+    app = AppTest.from_file("main.py", default_timeout=60)
+    first = timed(app.run)
+    times = []
+    for i in range(reruns):
+        field = app.sidebar.text_input[0]
+        times.append(timed(lambda: field.input(f"Name {i}").run()))
+
+    print(f"\n{'main.py first run':<34}{first * 1000:>10.1f} ms")
+    print(f"{'main.py rerun (sidebar typing)':<34}{statistics.median(times) * 1000:>10.1f} ms  "
+          f"(p95 {sorted(times)[int(len(times) * 0.95) - 1] * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup and rerun latency")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    # Constructing ChatGroq doesn't call the API, so a placeholder key is enough
+    os.environ.setdefault("GROQ_API_KEY", "bench-placeholder")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    bench_direct(args.reruns)
+    bench_apptest(args.reruns)
+
+
+if __name__ == "__main__":
+    main()
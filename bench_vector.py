@@ -0,0 +1,180 @@
+# bench_vector.py - NumPy vector store vs ChromaDB for portfolio retrieval
+#
+# Both engines get the same synthetic skill-set embeddings (no model
+# download), so the numbers isolate the store itself: ingest time, cold
+# start (a fresh interpreter importing the engine, opening the store and
+# answering one query), batched query latency, disk footprint, and how
+# many of the exact top-k neighbours Chroma's approximate HNSW search finds.
+#
+# Usage:
+#   python bench_vector.py
+#   python bench_vector.py --sizes 500,5000,20000 --batch 8 --k 3
+import argparse
+import hashlib
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from vector_store import NumpyVectorStore
+
+DIM = 384
+SKILLS = ["python", "django", "sql", "react", "typescript", "docker", "kubernetes", "aws", "kotlin",
+          "swift", "tensorflow", "java", "spring", "postgresql", "mongodb", "node.js", "angular",
+          "machine learning", "go", "rust", "terraform", "spark", "airflow", "graphql", "redis"]
+
+
+def skill_vector(skill):
+    seed = int.from_bytes(hashlib.blake2b(skill.encode("utf-8"), digest_size=8).digest(), "big")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def embed(skill_sets):
+    """Bag-of-skills embedding with a little noise, L2-normalized"""
+    vectors = np.stack([sum(skill_vector(s) for s in skills) for skills in skill_sets])
+    vectors += np.random.default_rng(len(skill_sets)).standard_normal(vectors.shape).astype(np.float32) * 0.1
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def disk_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / 1024 / 1024
+
+
+# Run in a fresh interpreter so the engine's import cost is counted
+COLD_START = {
+    "numpy": """
+import sys, time
+t = time.perf_counter()
+import numpy as np
+from vector_store import NumpyVectorStore
+store = NumpyVectorStore(sys.argv[1])
+store.query(query_embeddings=np.load(sys.argv[2]).tolist(), n_results=int(sys.argv[3]))
+print(time.perf_counter() - t)
+""",
+    "chroma": """
+import sys, time
+t = time.perf_counter()
+import numpy as np
+import chromadb
+collection = chromadb.PersistentClient(sys.argv[1]).get_collection(name="portfolio")
+collection.query(query_embeddings=np.load(sys.argv[2]).tolist(), n_results=int(sys.argv[3]))
+print(time.perf_counter() - t)
+""",
+}
+
+
+def cold_start(engine, path, query_path, k):
+    out = subprocess.run(
+        [sys.executable, "-c", COLD_START[engine], path, query_path, str(k)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def timed_queries(collection, queries, k, batch, repeats):
+    latencies = []
+    for r in range(repeats):
+        start = (r * batch) % len(queries)
+        chunk = queries[start:start + batch]
+        t = time.perf_counter()
+        collection.query(query_embeddings=chunk.tolist(), n_results=k)
+        latencies.append(time.perf_counter() - t)
+    return median(latencies) * 1000
+
+
+def bench_numpy(workdir, ids, documents, metadatas, vectors, queries, args):
+    path = os.path.join(workdir, "numpy")
+    t = time.perf_counter()
+    store = NumpyVectorStore(path)
+    with store.bulk():
+        for i in range(0, len(ids), 1000):
+            store.upsert(ids[i:i + 1000], documents[i:i + 1000], metadatas[i:i + 1000], vectors[i:i + 1000])
+    ingest = time.perf_counter() - t
+
+    cold = cold_start("numpy", path, os.path.join(workdir, "query.npy"), args.k)
+    store = NumpyVectorStore(path)
+
+    query_ms = timed_queries(store, queries, args.k, args.batch, args.repeats)
+    exact = store.query(query_embeddings=queries.tolist(), n_results=args.k)["ids"]
+    return {"ingest": ingest, "cold": cold, "query_ms": query_ms, "disk": disk_mb(path)}, exact
+
+
+def bench_chroma(workdir, ids, documents, metadatas, vectors, queries, args):
+    import chromadb
+
+    path = os.path.join(workdir, "chroma")
+    t = time.perf_counter()
+    client = chromadb.PersistentClient(path)
+    collection = client.get_or_create_collection(name="portfolio")
+    batch = min(1000, client.get_max_batch_size())
+    for i in range(0, len(ids), batch):
+        collection.upsert(ids=ids[i:i + batch], documents=documents[i:i + batch],
+                          metadatas=metadatas[i:i + batch], embeddings=vectors[i:i + batch].tolist())
+    ingest = time.perf_counter() - t
+    del collection, client
+
+    cold = cold_start("chroma", path, os.path.join(workdir, "query.npy"), args.k)
+    client = chromadb.PersistentClient(path)
+    collection = client.get_collection(name="portfolio")
+
+    query_ms = timed_queries(collection, queries, args.k, args.batch, args.repeats)
+    found = collection.query(query_embeddings=queries.tolist(), n_results=args.k)["ids"]
+    return {"ingest": ingest, "cold": cold, "query_ms": query_ms, "disk": disk_mb(path)}, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy vs ChromaDB portfolio retrieval benchmark")
+    parser.add_argument("--sizes", default="500,2000,10000", help="Comma-separated portfolio row counts")
+    parser.add_argument("--batch", type=int, default=8, help="Jobs per query batch")
+    parser.add_argument("--k", type=int, default=3, help="Results per job")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        import chromadb  # noqa: F401
+        have_chroma = True
+    except ImportError:
+        print("⚠️ chromadb not installed, benchmarking the NumPy store only")
+        have_chroma = False
+
+    rng = random.Random(args.seed)
+    header = (f"{'rows':>7}{'engine':>8}{'ingest (s)':>12}{'cold (s)':>10}{'query (ms)':>12}"
+              f"{'disk (MB)':>11}{'recall@k':>10}")
+    print(header)
+    print("-" * len(header))
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        rows = [rng.sample(SKILLS, 3) for _ in range(size)]
+        ids = [f"pf-{i}" for i in range(size)]
+        documents = [", ".join(skills) for skills in rows]
+        metadatas = [{"links": f"https://example.com/portfolio/{i}"} for i in range(size)]
+        vectors = embed(rows)
+        queries = embed([rng.sample(SKILLS, rng.randint(2, 5)) for _ in range(max(args.batch * 4, 64))])
+
+        with tempfile.TemporaryDirectory() as workdir:
+            np.save(os.path.join(workdir, "query.npy"), queries[:1])
+            result, exact = bench_numpy(workdir, ids, documents, metadatas, vectors, queries, args)
+            print(f"{size:>7}{'numpy':>8}{result['ingest']:>12.2f}{result['cold']:>10.3f}"
+                  f"{result['query_ms']:>12.2f}{result['disk']:>11.1f}{1.0:>10.3f}")
+            if have_chroma:
+                result, found = bench_chroma(workdir, ids, documents, metadatas, vectors, queries, args)
+                recall = sum(len(set(f) & set(e)) for f, e in zip(found, exact)) / (len(exact) * args.k)
+                print(f"{size:>7}{'chroma':>8}{result['ingest']:>12.2f}{result['cold']:>10.3f}"
+                      f"{result['query_ms']:>12.2f}{result['disk']:>11.1f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,23 @@
+import asyncio
+import contextvars
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
 from dotenv import load_dotenv
+from llm_cache import LLMCache
+from instrumentation import metrics
+from rate_limiter import PRIORITY_EXTRACT, PRIORITY_EMAIL, is_rate_limit_error
+from resources import get_scheduler
+from helpers import chunk_text, estimate_tokens
 
 load_dotenv()
 
-class Chain:
-    def __init__(self):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("❌ GROQ_API_KEY not found in .env file")
-        
-        self.llm = ChatGroq(
-            temperature=0, 
-            groq_api_key=api_key, 
-            model_name="llama-3.3-70b-versatile"
-        )
-
-    def extract_jobs(self, cleaned_text):
-        prompt_extract = PromptTemplate.from_template(
+PROMPT_EXTRACT = PromptTemplate.from_template(
             """
             ### SCRAPED TEXT FROM WEBSITE:
             {page_data}
@@ -33,34 +30,9 @@ class Chain:
             
             ### VALID JSON (NO PREAMBLE):
             """
-        )
-        chain_extract = prompt_extract | self.llm
-        
-        try:
-            # Limit text to avoid token overflow
-            limited_text = cleaned_text[:4000] if len(cleaned_text) > 4000 else cleaned_text
-            res = chain_extract.invoke(input={"page_data": limited_text})
-            
-            json_parser = JsonOutputParser()
-            res = json_parser.parse(res.content)
-            
-            return res if isinstance(res, list) else [res]
-            
-        except OutputParserException:
-            # Try with smaller text
-            try:
-                limited_text = cleaned_text[:2000]
-                res = chain_extract.invoke(input={"page_data": limited_text})
-                json_parser = JsonOutputParser()
-                res = json_parser.parse(res.content)
-                return res if isinstance(res, list) else [res]
-            except:
-                raise OutputParserException("Context too big. Unable to parse jobs.")
-        except Exception as e:
-            raise Exception(f"Error extracting jobs: {str(e)}")
+)
 
-    def write_mail(self, job, links, person_name="Locket", company_name="CogniCore", person_role="Business Development Executive"):
-        prompt_email = PromptTemplate.from_template(
+PROMPT_EMAIL = PromptTemplate.from_template(
             """
             ### JOB DESCRIPTION:
             {job_description}
@@ -90,10 +62,213 @@ class Chain:
             
             ### EMAIL (NO PREAMBLE):
             """
-        )
+)
+
+
+PROMPT_EMAILS = PromptTemplate.from_template(
+            """
+            ### JOBS (JSON):
+            {jobs_json}
+
+            ### INSTRUCTION:
+            You are {person_name}, {person_role} at {company_name}.
+            
+            COMPANY PROFILE:
+            {company_name} is an AI & Software Consulting company dedicated to facilitating
+            the seamless integration of business processes through automated tools. 
+            Over our experience, we have empowered numerous enterprises with tailored solutions, fostering scalability, 
+            process optimization, cost reduction, and heightened overall efficiency.
+            
+            TASK:
+            For EACH job above, write a separate professional cold email to the client regarding that job opportunity.
+            Describe how {company_name} can fulfill their needs based on our expertise, using that job's portfolio links.
+            
+            GUIDELINES:
+            1. Use a professional business tone
+            2. Connect our capabilities to each job's specific requirements
+            3. Mention that job's relevant portfolio links naturally
+            4. Include a clear call-to-action
+            5. Signature should be: {person_name}, {person_role}, {company_name}
+            
+            ### OUTPUT:
+            Return only a valid JSON object mapping each job "id" to its email text.
+            
+            ### VALID JSON (NO PREAMBLE):
+            """
+)
+
+
+def _job_key(job):
+    role = " ".join(str(job.get("role", "")).lower().split())
+    experience = " ".join(str(job.get("experience", "")).lower().split())
+    return role, experience
+
+
+def merge_jobs(job_lists):
+    """Merge per-chunk job lists, collapsing postings seen in overlapping chunks.
+
+    Jobs with the same role and experience are treated as one posting: their
+    skills are unioned (order kept) and the longer description wins.
+    """
+    merged = {}
+    for jobs in job_lists:
+        for job in jobs:
+            key = _job_key(job)
+            if key not in merged:
+                merged[key] = dict(job)
+                continue
+            existing = merged[key]
+            skills = existing.get("skills") or []
+            new_skills = job.get("skills") or []
+            if isinstance(skills, list) and isinstance(new_skills, list):
+                seen = {str(s).lower() for s in skills}
+                existing["skills"] = skills + [s for s in new_skills if str(s).lower() not in seen]
+            if len(str(job.get("description", ""))) > len(str(existing.get("description", ""))):
+                existing["description"] = job["description"]
+    return list(merged.values())
+
+
+def _token_usage(message):
+    """Prompt/completion token counts from an AIMessage(Chunk), if the provider sent them"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        return {"prompt_tokens": usage.get("input_tokens", 0),
+                "completion_tokens": usage.get("output_tokens", 0)}
+    usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    if usage:
+        return {"prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0)}
+    return {}
+
+
+# Typical length of one generated email, used for budgeting
+EMAIL_TOKENS = 500
+
+# (context window, max completion tokens) per model, for sizing batched calls
+MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": (131072, 32768),
+}
+DEFAULT_MODEL_LIMITS = (8192, 4096)
+
+
+class Chain:
+    def __init__(self, cache=None, llm=None, scheduler=None):
+        if llm is not None:
+            # Any LangChain chat model works, e.g. fake_llm.FakeChatModel offline
+            self.llm = llm
+            self.model_name = getattr(llm, "model_name", type(llm).__name__)
+            self.temperature = getattr(llm, "temperature", 0)
+        else:
+            api_key = os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("❌ GROQ_API_KEY not found in .env file")
+            
+            self.model_name = "llama-3.3-70b-versatile"
+            self.temperature = 0
+            self.llm = ChatGroq(
+                temperature=self.temperature, 
+                groq_api_key=api_key, 
+                model_name=self.model_name
+            )
+        self.context_window, self.max_output_tokens = MODEL_LIMITS.get(self.model_name, DEFAULT_MODEL_LIMITS)
+        # Pass cache=False to always hit the API
+        if cache is None:
+            cache = LLMCache(os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"))
+        self.cache = cache or None
+        # Groq calls share the process-wide rate limiter; an injected llm
+        # (e.g. the offline fake) is only limited if a scheduler is passed
+        if scheduler is None and llm is None:
+            scheduler = get_scheduler()
+        self.scheduler = scheduler or None
+
+    def _estimate(self, rendered_prompt, stage, completion=None):
+        """Tokens to reserve for a call: the prompt plus a typical completion"""
+        if completion is None:
+            completion = 1000 if stage == "llm_extract" else EMAIL_TOKENS
+        return estimate_tokens(rendered_prompt) + completion
+
+    def _invoke(self, prompt, inputs, stage="llm", completion_tokens=None):
+        """Run ``prompt | llm`` and return the response text, using the cache if set"""
+        with metrics.stage(stage, model=self.model_name) as event:
+            rendered = prompt.format(**inputs)
+            key = None
+            if self.cache:
+                key = LLMCache.make_key(rendered, self.model_name, self.temperature)
+                cached = self.cache.get(key)
+                event["cache_hit"] = cached is not None
+                if cached is not None:
+                    return cached
+            
+            if self.scheduler:
+                estimated = self._estimate(rendered, stage, completion_tokens)
+                priority = PRIORITY_EXTRACT if stage == "llm_extract" else PRIORITY_EMAIL
+                res = self.scheduler.call(
+                    lambda: (prompt | self.llm).invoke(inputs), estimated, priority, stage
+                )
+            else:
+                res = (prompt | self.llm).invoke(inputs)
+            event.update(_token_usage(res))
+            if self.scheduler and event.get("prompt_tokens"):
+                self.scheduler.settle(estimated, event["prompt_tokens"] + event.get("completion_tokens", 0))
+            
+            if key is not None:
+                self.cache.put(key, res.content)
+            return res.content
+
+    def extract_jobs(self, cleaned_text, chunk_tokens=1500, overlap_tokens=150, max_workers=4):
+        """Extract job postings from page text.
+
+        Long pages are split into overlapping token-budgeted chunks that are
+        extracted concurrently, then merged and de-duplicated, so no part of
+        the page is dropped by truncation.
+        """
+        chunks = chunk_text(cleaned_text, chunk_tokens, overlap_tokens)
+        if not chunks:
+            return []
         
-        chain_email = prompt_email | self.llm
+        try:
+            if len(chunks) == 1:
+                results = [self._extract_chunk(chunks[0])]
+            else:
+                # Copy the context here, in the caller's thread, so chunk calls
+                # stay attributed to this job (one copy per chunk: a context
+                # can't be entered by two threads at once)
+                contexts = [contextvars.copy_context() for _ in chunks]
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+                    results = list(pool.map(
+                        lambda context, chunk: context.run(self._extract_chunk, chunk), contexts, chunks
+                    ))
+        except Exception as e:
+            raise Exception(f"Error extracting jobs: {str(e)}")
         
+        if all(jobs is None for jobs in results):
+            raise OutputParserException("Unable to parse jobs from page.")
+        return merge_jobs(jobs for jobs in results if jobs)
+
+    def _extract_chunk(self, text, min_tokens=250):
+        """Extract jobs from one chunk; returns None if the output can't be parsed.
+
+        On a parse failure the chunk is split in half and each half retried,
+        rather than throwing the rest of the text away.
+        """
+        content = self._invoke(PROMPT_EXTRACT, {"page_data": text}, stage="llm_extract")
+        try:
+            res = JsonOutputParser().parse(content)
+        except OutputParserException:
+            if estimate_tokens(text) < min_tokens * 2:
+                return None
+            metrics.increment("retries", "llm_extract")
+            halves = chunk_text(text, estimate_tokens(text) // 2 + 1, 0)
+            parsed = [self._extract_chunk(half, min_tokens) for half in halves]
+            if all(jobs is None for jobs in parsed):
+                return None
+            return [job for jobs in parsed if jobs for job in jobs]
+        if isinstance(res, dict):
+            # Some responses wrap the list, e.g. {"jobs": [...]}
+            res = res["jobs"] if isinstance(res.get("jobs"), list) else [res]
+        return [job for job in res if isinstance(job, dict)]
+
+    def _email_inputs(self, job, links, person_name, company_name, person_role):
         # Format links
         if links and isinstance(links, list):
             links_text = "\n".join([f"- {link}" for link in links[:3]])
@@ -102,15 +277,183 @@ class Chain:
         else:
             links_text = "Please visit our portfolio for relevant case studies."
         
-        res = chain_email.invoke({
+        return {
             "job_description": str(job), 
             "link_list": links_text,
             "person_name": person_name,
             "company_name": company_name,
             "person_role": person_role
-        })
+        }
+
+    def write_mail(self, job, links, person_name="Locket", company_name="CogniCore", person_role="Business Development Executive"):
+        inputs = self._email_inputs(job, links, person_name, company_name, person_role)
+        return self._invoke(PROMPT_EMAIL, inputs, stage="llm_write")
+
+    def _batch_budget(self):
+        """``(total, completion)`` token budget for one batched email call.
+
+        The prompt plus the emails must fit the model's context window (less
+        a margin, as token counts are estimated) and the emails its
+        completion limit. With a scheduler the call must also fit the
+        per-minute token budget, since Groq rejects larger requests outright.
+        """
+        total = int(self.context_window * 0.9)
+        if self.scheduler:
+            total = min(total, int(self.scheduler.tokens.capacity))
+        return total, self.max_output_tokens
+
+    def write_mails(self, jobs, links_per_job, person_name="Locket", company_name="CogniCore",
+                    person_role="Business Development Executive", max_batch_tokens=None,
+                    max_jobs_per_batch=10, max_workers=4):
+        """Write emails for many jobs, several per LLM call.
+
+        Jobs are packed into batches sized so the prompt plus the expected
+        emails stay within the model's limits (see _batch_budget, or
+        ``max_batch_tokens`` if given), which means the company profile and
+        guidelines are sent once per batch rather than once per job. Each
+        batch asks for a JSON object of emails keyed by job id. Jobs whose
+        email is missing or unparseable fall back to write_mail. Returns the
+        emails in the same order as ``jobs``.
+        """
+        sender = {"person_name": person_name, "company_name": company_name, "person_role": person_role}
+        entries = []
+        for index, (job, links) in enumerate(zip(jobs, links_per_job)):
+            links_text = self._email_inputs(job, links, **sender)["link_list"]
+            entries.append({"id": f"job{index + 1}", "description": str(job), "portfolio_links": links_text})
+        
+        if max_batch_tokens is None:
+            max_batch_tokens, max_completion = self._batch_budget()
+        else:
+            max_completion = max_batch_tokens
+        base = estimate_tokens(PROMPT_EMAILS.format(jobs_json="", **sender))
+        batches = []
+        current, used = [], base
+        for index, entry in enumerate(entries):
+            cost = estimate_tokens(json.dumps(entry)) + EMAIL_TOKENS
+            if current and (used + cost > max_batch_tokens or len(current) >= max_jobs_per_batch
+                            or EMAIL_TOKENS * (len(current) + 1) > max_completion):
+                batches.append(current)
+                current, used = [], base
+            current.append(index)
+            used += cost
+        if current:
+            batches.append(current)
+        
+        emails = [None] * len(entries)
+        
+        def run_batch(batch):
+            # Failures leave the batch's emails as None for the per-job fallback
+            # below, so one bad batch doesn't throw away the others' emails
+            if len(batch) == 1:
+                # Nothing to share with a single job
+                index = batch[0]
+                try:
+                    emails[index] = self.write_mail(jobs[index], links_per_job[index], **sender)
+                except Exception as e:
+                    print(f"⚠️ Email for job {index + 1} failed, will retry: {e}")
+                return
+            inputs = {"jobs_json": json.dumps([entries[i] for i in batch], indent=1), **sender}
+            try:
+                content = self._invoke(PROMPT_EMAILS, inputs, stage="llm_write_batch",
+                                       completion_tokens=EMAIL_TOKENS * len(batch))
+                parsed = JsonOutputParser().parse(content)
+            except OutputParserException:
+                parsed = {}
+            except Exception as e:
+                print(f"⚠️ Batch of {len(batch)} emails failed, falling back to one per job: {e}")
+                parsed = {}
+            if not isinstance(parsed, dict):
+                parsed = {}
+            for index in batch:
+                email = parsed.get(entries[index]["id"])
+                if isinstance(email, str) and email.strip():
+                    emails[index] = email.strip()
+        
+        # Contexts are copied here, in the caller's thread, so every call
+        # stays attributed to the current job
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches) or 1))) as pool:
+            contexts = [contextvars.copy_context() for _ in batches]
+            list(pool.map(lambda context, batch: context.run(run_batch, batch), contexts, batches))
+            
+            # Per-job fallback for anything the batched answer didn't cover
+            missing = [index for index, email in enumerate(emails) if email is None]
+            if missing:
+                metrics.increment("retries", "llm_write_batch", len(missing))
+                contexts = [contextvars.copy_context() for _ in missing]
+                fallback = pool.map(
+                    lambda context, index: context.run(
+                        self.write_mail, jobs[index], links_per_job[index], **sender
+                    ),
+                    contexts, missing
+                )
+                for index, email in zip(missing, fallback):
+                    emails[index] = email
         
-        return res.content
+        return emails
+
+    async def astream_mail(self, job, links, person_name="Locket", company_name="CogniCore", person_role="Business Development Executive"):
+        """Async generator yielding the email text as it streams from the LLM"""
+        inputs = self._email_inputs(job, links, person_name, company_name, person_role)
+        with metrics.stage("llm_write", model=self.model_name, streamed=True) as event:
+            key = None
+            if self.cache:
+                key = LLMCache.make_key(PROMPT_EMAIL.format(**inputs), self.model_name, self.temperature)
+                cached = self.cache.get(key)
+                event["cache_hit"] = cached is not None
+                if cached is not None:
+                    yield cached
+                    return
+            
+            start = time.perf_counter()
+            parts = []
+            estimated = self._estimate(PROMPT_EMAIL.format(**inputs), "llm_write")
+            for attempt in range(self.scheduler.max_retries + 1 if self.scheduler else 1):
+                if self.scheduler:
+                    await self.scheduler.acquire_async(estimated, PRIORITY_EMAIL)
+                try:
+                    async for chunk in (PROMPT_EMAIL | self.llm).astream(inputs):
+                        if chunk.content:
+                            if not parts:
+                                event["first_token_seconds"] = time.perf_counter() - start
+                            parts.append(chunk.content)
+                            yield chunk.content
+                        event.update(_token_usage(chunk))
+                    break
+                except Exception as e:
+                    # Only retry if nothing was streamed yet, or the text would repeat
+                    if (not self.scheduler or parts or not is_rate_limit_error(e)
+                            or attempt == self.scheduler.max_retries):
+                        raise
+                    metrics.increment("retries", "llm_write")
+                    await asyncio.sleep(self.scheduler.backoff(attempt, e))
+            if self.scheduler and event.get("prompt_tokens"):
+                self.scheduler.settle(estimated, event["prompt_tokens"] + event.get("completion_tokens", 0))
+            
+            if key is not None:
+                self.cache.put(key, "".join(parts))
+
+    async def astream_mails(self, jobs, links_per_job, on_token=None, max_concurrency=4, **sender):
+        """Write emails for several jobs concurrently, at most ``max_concurrency`` at a time.
+
+        ``on_token(index, text_so_far)`` is called as each job's email streams
+        in. Returns one entry per job: the email text, or the exception that
+        job raised, so one failed job doesn't lose the others.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run(index, job, links):
+            async with semaphore:
+                text = ""
+                async for part in self.astream_mail(job, links, **sender):
+                    text += part
+                    if on_token:
+                        on_token(index, text)
+                return text
+
+        return await asyncio.gather(
+            *(run(index, job, links) for index, (job, links) in enumerate(zip(jobs, links_per_job))),
+            return_exceptions=True
+        )
 
 if __name__ == "__main__":
     # Test the initialization
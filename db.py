@@ -0,0 +1,40 @@
+# db.py - Shared SQLite setup for the on-disk caches, index and queue
+import os
+import sqlite3
+
+
+def connect(path, schema=(), **kwargs):
+    """Open ``path`` in WAL mode, creating its directory, and run the ``schema`` statements.
+
+    The connection can be used from any thread; callers serialize access
+    with their own lock. Extra keyword arguments go to ``sqlite3.connect``.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in schema:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+def evict_oldest(conn, table, key, order_by, max_entries, max_bytes):
+    """Delete rows of ``table`` in ``order_by`` order until it is back under budget.
+
+    The budget is at most ``max_entries`` rows whose ``size`` column sums
+    to at most ``max_bytes``. Rows are deleted by their ``key`` column;
+    the caller commits.
+    """
+    count, total = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}").fetchone()
+    if count <= max_entries and total <= max_bytes:
+        return
+    doomed = []
+    for row_key, size in conn.execute(f"SELECT {key}, size FROM {table} ORDER BY {order_by} ASC"):
+        if count <= max_entries and total <= max_bytes:
+            break
+        doomed.append((row_key,))
+        count -= 1
+        total -= size
+    conn.executemany(f"DELETE FROM {table} WHERE {key} = ?", doomed)
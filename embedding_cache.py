@@ -0,0 +1,108 @@
+# embedding_cache.py - LRU cache of query embeddings with an on-disk spill
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from db import connect
+
+
+class EmbeddingCache:
+    """Two-level cache mapping query keys to embedding vectors.
+
+    The most recently used ``max_memory`` vectors live in an in-process LRU.
+    Every vector is also written to SQLite as a float32 blob, so a restart
+    (or another worker process) starts warm; the disk table is trimmed to
+    ``max_disk`` entries by last access.
+    """
+
+    def __init__(self, path="embedding_cache.sqlite3", max_memory=4096, max_disk=200000):
+        self.path = path
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn = connect(path, [
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                accessed_at REAL NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed_at)",
+        ])
+
+    def get_many(self, keys):
+        """Vectors (lists of floats) for ``keys``, with None for each miss"""
+        results = [None] * len(keys)
+        spilled = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                else:
+                    spilled.append(i)
+
+            if spilled:
+                wanted = list({keys[i] for i in spilled})
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(wanted))})", wanted
+                ).fetchall()
+                found = {}
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                    self._remember(key, found[key])
+                if found:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+                    self._conn.commit()
+                for i in spilled:
+                    results[i] = found.get(keys[i])
+
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return results
+
+    def put_many(self, keys, vectors):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                vector = [float(x) for x in vector]
+                self._remember(key, vector)
+                rows.append((key, array("f", vector).tobytes(), now))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk,),
+            )
+            self._conn.commit()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            on_disk = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"memory": len(self._memory), "disk": on_disk, "hits": self.hits, "misses": self.misses}
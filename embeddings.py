@@ -0,0 +1,136 @@
+# embeddings.py - Embedding functions that don't need ChromaDB installed
+import hashlib
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import urllib.request
+
+import numpy as np
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MiniLMEmbeddingFunction:
+    """all-MiniLM-L6-v2 run directly with onnxruntime, without importing chromadb.
+
+    This is the same model, tokenizer settings and mean pooling as Chroma's
+    DefaultEmbeddingFunction, and it shares Chroma's download cache, so the
+    vectors match what a Chroma-built store holds and an existing download
+    is reused. The model is downloaded (about 80 MB), checked against the
+    same SHA-256 as Chroma's downloader and loaded on first call.
+    """
+
+    URL = "https://chroma-onnx-models.s3.amazonaws.com/all-MiniLM-L6-v2/onnx.tar.gz"
+    SHA256 = "913d7300ceae3b2dbc2c50d1de4baacab4be7b9380491c27fab7418616a16ec3"
+    FILES = ("config.json", "model.onnx", "special_tokens_map.json", "tokenizer_config.json",
+             "tokenizer.json", "vocab.txt")
+    CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "chroma", "onnx_models", "all-MiniLM-L6-v2")
+
+    def __init__(self, cache_dir=None, batch_size=32):
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        self.batch_size = batch_size
+        self._session = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _model_dir(self):
+        model_dir = os.path.join(self.cache_dir, "onnx")
+        if all(os.path.exists(os.path.join(model_dir, name)) for name in self.FILES):
+            return model_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Same archive path as Chroma, so either one reuses the other's download
+        archive = os.path.join(self.cache_dir, "onnx.tar.gz")
+        if not os.path.exists(archive) or _sha256(archive) != self.SHA256:
+            print(f"⬇️ Downloading embedding model to {self.cache_dir}")
+            partial = f"{archive}.{os.getpid()}.part"
+            try:
+                urllib.request.urlretrieve(self.URL, partial)
+                if _sha256(partial) != self.SHA256:
+                    raise ValueError(f"Download of {self.URL} does not match the expected SHA-256; "
+                                     "corrupted or tampered file")
+                os.replace(partial, archive)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+        with tempfile.TemporaryDirectory(dir=self.cache_dir) as tmp:
+            with tarfile.open(archive, "r:gz") as tar:
+                members = [m for m in tar.getmembers()
+                           if m.isfile() and not os.path.isabs(m.name) and ".." not in m.name.split("/")]
+                tar.extractall(tmp, members=members)
+            # An interrupted earlier extraction can leave a partial directory,
+            # which os.replace can't overwrite
+            if os.path.isdir(model_dir):
+                shutil.rmtree(model_dir)
+            os.replace(os.path.join(tmp, "onnx"), model_dir)
+        return model_dir
+
+    def _load(self):
+        with self._lock:
+            if self._session is None:
+                import onnxruntime
+                from tokenizers import Tokenizer
+
+                model_dir = self._model_dir()
+                tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+                tokenizer.enable_truncation(max_length=256)
+                tokenizer.enable_padding(pad_id=0, pad_token="[PAD]", length=256)
+                options = onnxruntime.SessionOptions()
+                options.log_severity_level = 3
+                self._session = onnxruntime.InferenceSession(
+                    os.path.join(model_dir, "model.onnx"),
+                    sess_options=options,
+                    providers=["CPUExecutionProvider"],
+                )
+                self._tokenizer = tokenizer
+
+    def __call__(self, input):
+        self._load()
+        vectors = []
+        for i in range(0, len(input), self.batch_size):
+            encoded = self._tokenizer.encode_batch(list(input[i:i + self.batch_size]))
+            input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+            hidden = self._session.run(None, {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": np.zeros_like(input_ids),
+            })[0]
+            # Mean over real (non-padding) tokens, then unit length
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.astype(np.float32))
+        return vectors
+
+
+class HashEmbeddingFunction:
+    """Deterministic bag-of-words embedding via feature hashing.
+
+    Needs no model or network, so benchmarks and tests run offline. Texts
+    that share words get similar vectors, which is enough for skill lists.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in _WORD.findall(str(text).lower()):
+                h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+                vector[h % self.dim] += 1.0 if h >> 63 else -1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
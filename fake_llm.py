@@ -0,0 +1,118 @@
+# fake_llm.py - Deterministic offline stand-in for ChatGroq
+import asyncio
+import json
+import re
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from helpers import estimate_tokens
+
+# Fixture pages (see bench_pipeline.py) describe each job in this form
+_JOB = re.compile(
+    r"Position (?P<role>.+?) Skills (?P<skills>.+?) Experience (?P<years>\d+) years "
+    r"Description (?P<description>.+?) Apply now"
+)
+_ROLE_IN_EMAIL = re.compile(r"'role': '([^']*)'")
+_SENDER = re.compile(r"You are (.+?), (.+?) at (.+?)\.")
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers the extract and email prompts without a network call.
+
+    Responses depend only on the prompt, so runs are repeatable. ``latency``
+    seconds are spent per call (split between time-to-first-token and the
+    rest of the stream when streaming), standing in for the API round trip.
+    """
+
+    model_name: str = "fake-llm"
+    temperature: float = 0
+    latency: float = 0.5
+    stream_chunks: int = 20
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _respond(self, prompt):
+        if "### SCRAPED TEXT FROM WEBSITE" in prompt:
+            jobs = [
+                {
+                    "role": m.group("role"),
+                    "experience": f"{m.group('years')} years",
+                    "skills": m.group("skills").split(),
+                    "description": m.group("description"),
+                }
+                for m in _JOB.finditer(prompt)
+            ]
+            if not jobs:
+                # Unknown page layout: report one generic posting
+                words = prompt.split("### SCRAPED TEXT FROM WEBSITE:")[1].split()[:40]
+                jobs = [{"role": "Software Engineer", "experience": "", "skills": [],
+                         "description": " ".join(words)}]
+            return json.dumps(jobs)
+
+        sender = _SENDER.search(prompt)
+        sender = sender.groups() if sender else ("Locket", "Business Development Executive", "CogniCore")
+        if "### JOBS (JSON):" in prompt:
+            jobs_json = prompt.split("### JOBS (JSON):")[1].split("### INSTRUCTION:")[0]
+            return json.dumps({
+                entry["id"]: self._email(_ROLE_IN_EMAIL.search(entry["description"]), *sender)
+                for entry in json.loads(jobs_json)
+            })
+        return self._email(_ROLE_IN_EMAIL.search(prompt), *sender)
+
+    @staticmethod
+    def _email(role, name, title, company):
+        return (
+            f"Subject: Helping you hire for {role.group(1) if role else 'your open role'}\n\n"
+            f"Dear Hiring Manager,\n\n"
+            f"I noticed you are looking for a {role.group(1) if role else 'new team member'}. "
+            f"{company} has delivered similar projects and can help you move faster.\n\n"
+            f"Would you be open to a short call next week?\n\n"
+            f"Best regards,\n{name}, {title}, {company}"
+        )
+
+    def _message(self, messages):
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = self._respond(prompt)
+        usage = {
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": estimate_tokens(text),
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return text, usage
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        text, usage = self._message(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        text, usage = self._message(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _pieces(self, text):
+        size = max(1, len(text) // self.stream_chunks + 1)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._message(messages)
+        pieces = self._pieces(text)
+        time.sleep(self.latency / 2)
+        for i, piece in enumerate(pieces):
+            time.sleep(self.latency / 2 / len(pieces))
+            last = i == len(pieces) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage if last else None))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._message(messages)
+        pieces = self._pieces(text)
+        await asyncio.sleep(self.latency / 2)
+        for i, piece in enumerate(pieces):
+            await asyncio.sleep(self.latency / 2 / len(pieces))
+            last = i == len(pieces) - 1
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage if last else None))
@@ -0,0 +1,187 @@
+# fetcher.py - Pooled HTTP fetching with per-host limits and a conditional-request page cache
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from db import connect, evict_oldest
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+class PageTooLarge(Exception):
+    """Raised when a response body exceeds the fetcher's ``max_bytes``"""
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PageFetcher:
+    """Fetch pages over one pooled ``requests`` session, caching them on disk.
+
+    At most ``per_host`` requests run against any one host at a time, bodies
+    are streamed and abandoned past ``max_bytes``, and transient 5xx errors
+    are retried. Cached pages are revalidated with If-None-Match /
+    If-Modified-Since, so an unchanged page costs a 304 rather than a full
+    download. The cache also remembers the jobs extracted from each page
+    together with the hash of its text, letting callers skip extraction when
+    a page has not changed since the last run. The cache is bounded by
+    entry count and total size; the least recently fetched pages go first.
+    """
+
+    def __init__(self, cache_path="page_cache.sqlite3", timeout=(5, 20), max_bytes=5 * 1024 * 1024,
+                 per_host=4, pool_size=32, max_entries=20000, cache_max_bytes=500 * 1024 * 1024):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.max_entries = max_entries
+        self.cache_max_bytes = cache_max_bytes
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                              allowed_methods=frozenset(["GET"])),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._conn = None
+        if cache_path:
+            self._conn = connect(cache_path, [
+                """CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    html TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    text_hash TEXT,
+                    jobs TEXT,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    fetched_at REAL NOT NULL
+                )""",
+            ])
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+            if "size" not in columns:
+                # Caches written before the byte bound existed
+                self._conn.execute("ALTER TABLE pages ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute(
+                    "UPDATE pages SET size = length(CAST(html AS BLOB)) + COALESCE(length(CAST(jobs AS BLOB)), 0)"
+                )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages(fetched_at)")
+            self._conn.commit()
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+        return slot
+
+    def _cached(self, url):
+        if self._conn is None:
+            return None
+        with self._lock:
+            return self._conn.execute(
+                "SELECT html, etag, last_modified FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def fetch(self, url):
+        """Return ``(html, from_cache)``; ``from_cache`` is True on a 304 revalidation"""
+        cached = self._cached(url)
+        headers = {}
+        if cached:
+            _, etag, last_modified = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        with self._host_slot(url):
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    self._touch(url)
+                    return cached[0], True
+                response.raise_for_status()
+                html = self._read(response)
+
+        self._store(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return html, False
+
+    def _read(self, response):
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise PageTooLarge(f"Page is {int(length)} bytes (limit {self.max_bytes})")
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise PageTooLarge(f"Page exceeds {self.max_bytes} bytes")
+            chunks.append(chunk)
+        # requests assumes ISO-8859-1 for text/* without a charset; most pages are UTF-8
+        declared = "charset" in response.headers.get("Content-Type", "").lower()
+        encoding = response.encoding if declared and response.encoding else "utf-8"
+        return b"".join(chunks).decode(encoding, errors="replace")
+
+    def _store(self, url, html, etag, last_modified):
+        if self._conn is None:
+            return
+        with self._lock:
+            # Keep the extracted jobs; they are only reused if the text hash still matches
+            self._conn.execute(
+                """INSERT INTO pages (url, html, etag, last_modified, size, fetched_at) VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET html = excluded.html, etag = excluded.etag,
+                   last_modified = excluded.last_modified, fetched_at = excluded.fetched_at,
+                   size = excluded.size + COALESCE(length(CAST(jobs AS BLOB)), 0)""",
+                (url, html, etag, last_modified, len(html.encode("utf-8")), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Least recently fetched first
+        evict_oldest(self._conn, "pages", "url", "fetched_at", self.max_entries, self.cache_max_bytes)
+
+    def _touch(self, url):
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def cached_jobs(self, url, text_hash):
+        """Jobs extracted from ``url`` last time, if its text hash is unchanged, else None"""
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT jobs FROM pages WHERE url = ? AND text_hash = ?", (url, text_hash)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    def store_jobs(self, url, text_hash, jobs):
+        if self._conn is None:
+            return
+        payload = json.dumps(jobs, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET text_hash = ?, jobs = ?, size = length(CAST(html AS BLOB)) + ? WHERE url = ?",
+                (text_hash, payload, len(payload.encode("utf-8")), url),
+            )
+            self._evict()
+            self._conn.commit()
@@ -1,20 +1,169 @@
-
 import re
+from html.parser import HTMLParser
+
+# Compiled once at import
+_TAGS = re.compile(r'<[^>]*>')
+_URLS = re.compile(r'https?://[^\s<>"]+')
+# Every ASCII byte that is neither alphanumeric nor whitespace
+_SPECIAL_BYTES = bytes(b for b in range(128) if not (chr(b).isalnum() or chr(b).isspace()))
 
 def clean_text(text):
-    # Remove HTML tags
-    text = re.sub(r'<[^>]*?>', '', text)
-    # Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    # Remove special characters
-    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s{2,}', ' ', text)
-    # Trim leading and trailing whitespace
-    text = text.strip()
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
+    # Remove HTML tags, then URLs
+    text = _URLS.sub('', _TAGS.sub('', text))
+    # Remove special characters: non-ASCII is dropped by the encode and ASCII
+    # punctuation by a byte translate, which is much faster than a regex pass
+    text = text.replace('\xa0', ' ').encode('ascii', 'ignore').translate(None, _SPECIAL_BYTES).decode('ascii')
+    # Collapse all whitespace to single spaces and trim
+    return ' '.join(text.split())
+
+# Elements that never carry job text
+BOILERPLATE_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe',
+    'nav', 'header', 'footer', 'aside', 'form', 'button', 'select', 'title',
+}
+# Page-level chrome, but inside <main>/<article> they hold e.g. the job title
+_SECTION_TAGS = {'header', 'footer'}
+# Only containers that are reliably closed are skipped by class/id, so an
+# unclosed <p class="menu"> can't swallow the rest of the page
+_NOISE_CONTAINERS = {'div', 'section', 'ul', 'ol', 'span', 'dialog'}
+# Elements (by tag, class or id) that usually wrap the postings themselves
+_SIGNAL_TAGS = {'main', 'article'}
+_SIGNAL_ATTR = re.compile(r'job|career|position|opening|vacanc|posting|role', re.IGNORECASE)
+# Matched against whole class/id words and their -/_ parts, so "sub-menu"
+# is noise but "submenu-and-content" and "shared-services" are not
+_NOISE_WORDS = {
+    'cookie', 'cookies', 'consent', 'banner', 'menu', 'navbar', 'breadcrumb', 'breadcrumbs',
+    'sidebar', 'newsletter', 'share', 'social',
+}
+_ATTR_PARTS = re.compile(r'[^a-z0-9]+')
+_BLOCK_TAGS = {
+    'p', 'div', 'section', 'li', 'ul', 'ol', 'br', 'tr', 'td', 'th', 'table',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dd', 'dt', 'main', 'article',
+}
+
+
+def _is_noise(attr_text):
+    return any(part in _NOISE_WORDS for part in _ATTR_PARTS.split(attr_text.lower()))
+
+
+class _TextExtractor(HTMLParser):
+    """Collects page text, skipping boilerplate and putting job-ish sections first"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.signal = []
+        self.other = []
+        # (tag, depth of that tag) of the element we're currently skipping
+        self._skip = None
+        self._skip_depth = 0
+        self._signal = None
+        self._signal_depth = 0
+        # How many <main>/<article> elements we're inside
+        self._content_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip is not None:
+            if tag == self._skip:
+                self._skip_depth += 1
+            return
+        
+        attr_text = ' '.join(value for name, value in attrs if name in ('class', 'id') and value)
+        boilerplate = tag in BOILERPLATE_TAGS and not (tag in _SECTION_TAGS and self._content_depth)
+        if boilerplate or (tag in _NOISE_CONTAINERS and attr_text and _is_noise(attr_text)):
+            self._skip, self._skip_depth = tag, 1
+            return
+        
+        if tag in _SIGNAL_TAGS:
+            self._content_depth += 1
+        
+        if self._signal is None:
+            if tag in _SIGNAL_TAGS or (attr_text and _SIGNAL_ATTR.search(attr_text)):
+                self._signal, self._signal_depth = tag, 1
+        elif tag == self._signal:
+            self._signal_depth += 1
+        
+        if tag in _BLOCK_TAGS:
+            self._out().append(' ')
+
+    def handle_endtag(self, tag):
+        if self._skip is not None:
+            if tag == self._skip:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip = None
+                    self._out().append(' ')
+            return
+        
+        if tag in _SIGNAL_TAGS and self._content_depth:
+            self._content_depth -= 1
+        
+        if tag == self._signal:
+            self._signal_depth -= 1
+            if self._signal_depth == 0:
+                self._signal = None
+        
+        if tag in _BLOCK_TAGS:
+            self._out().append(' ')
+
+    def handle_data(self, data):
+        if self._skip is None:
+            self._out().append(data)
+
+    def _out(self):
+        return self.other if self._signal is None else self.signal
+
+def clean_html(html):
+    """Turn raw page HTML into cleaned text for the LLM.
+
+    Boilerplate elements (scripts, styles, nav, page-level header and
+    footer, cookie banners, ...) are dropped during parsing, and text from ``<main>``,
+    ``<article>`` or job/career-looking sections is placed before the rest
+    so it lands inside the extraction token budget. ``html`` may be a string
+    or an iterable of string chunks.
+    """
+    parser = _TextExtractor()
+    for chunk in ([html] if isinstance(html, str) else html):
+        parser.feed(chunk)
+    parser.close()
+    return clean_text(''.join(parser.signal) + ' ' + ''.join(parser.other))
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+def chunk_text(text, max_tokens=1500, overlap_tokens=150):
+    """Split text into word-aligned chunks of roughly ``max_tokens`` tokens.
+
+    Consecutive chunks share about ``overlap_tokens`` tokens so a job posting
+    that straddles a boundary is seen whole by at least one chunk.
+    """
+    words = text.split()
+    if not words:
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    max_chars = max_tokens * 4
+    overlap_chars = overlap_tokens * 4
+    chunks = []
+    start = 0
+    while start < len(words):
+        size = 0
+        end = start
+        while end < len(words) and (size == 0 or size + len(words[end]) + 1 <= max_chars):
+            size += len(words[end]) + 1
+            end += 1
+        chunks.append(' '.join(words[start:end]))
+        if end >= len(words):
+            break
+        # Step back far enough to cover the overlap, but always move forward
+        back = end
+        overlap = 0
+        while back > start + 1 and overlap + len(words[back - 1]) + 1 <= overlap_chars:
+            back -= 1
+            overlap += len(words[back]) + 1
+        start = back
+    return chunks
 
 # Optional: Add more utility functions if needed
 def extract_keywords(text, n=10):
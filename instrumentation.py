@@ -0,0 +1,201 @@
+# instrumentation.py - Per-stage timing, token and cache metrics for the pipeline
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The job (URL or job id) that the current pipeline work belongs to. Set it
+# with Metrics.job(...) and nested stages pick it up automatically.
+current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class JsonlSink:
+    """Append every event to a JSONL file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class Metrics:
+    """Collects stage timings, token counts and counters, and fans events out to sinks.
+
+    Each finished stage becomes an event dict (stage, job, seconds, status
+    and any extra fields such as prompt_tokens or cache_hit). Events are
+    kept in a bounded in-memory buffer, passed to every registered sink,
+    and rolled up into counters for the Prometheus text export.
+    """
+
+    def __init__(self, max_events=10000):
+        self.events = deque(maxlen=max_events)
+        self.sinks = []
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        """Register a callable that receives every event dict"""
+        self.sinks.append(sink)
+
+    @contextlib.contextmanager
+    def job(self, job_id):
+        """Attribute every stage recorded inside this block to ``job_id``"""
+        token = current_job.set(job_id)
+        try:
+            yield
+        finally:
+            current_job.reset(token)
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        """Time a block of work; fields set on the yielded dict end up in the event"""
+        event = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception as e:
+            event["status"] = "error"
+            event["error"] = str(e)
+            raise
+        finally:
+            event.setdefault("status", "ok")
+            self.record(name, seconds=time.perf_counter() - start, **event)
+
+    def record(self, stage, **fields):
+        """Record a finished event for ``stage``"""
+        event = {"ts": time.time(), "stage": stage, "job": current_job.get()}
+        event.update(fields)
+        with self._lock:
+            self.events.append(event)
+            self._add(("stage_calls_total", stage, event.get("status", "ok")), 1)
+            if "seconds" in event:
+                self._add(("stage_seconds_total", stage, None), event["seconds"])
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if event.get(kind):
+                    self._add(("tokens_total", stage, kind[:-len("_tokens")]), event[kind])
+            if "cache_hit" in event:
+                self._add(("cache_total", stage, "hit" if event["cache_hit"] else "miss"), 1)
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                print(f"⚠️ Metrics sink failed: {e}")
+
+    def increment(self, name, stage, amount=1):
+        """Bump a named counter such as ``retries`` for ``stage``"""
+        with self._lock:
+            self._add((f"{name}_total", stage, None), amount)
+
+    def _add(self, key, amount):
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def events_for(self, job_id):
+        """Buffered events recorded for one job"""
+        with self._lock:
+            return [event for event in self.events if event.get("job") == job_id]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def export_jsonl(self, path):
+        """Write the buffered events to ``path``"""
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def prometheus_text(self, prefix="coldemail"):
+        """Render counters in the Prometheus text exposition format"""
+        by_name = {}
+        for (name, stage, label), value in self.snapshot().items():
+            by_name.setdefault(name, []).append((stage, label, value))
+
+        label_names = {
+            "stage_calls_total": "status",
+            "tokens_total": "kind",
+            "cache_total": "result",
+        }
+        lines = []
+        for name in sorted(by_name):
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for stage, label, value in sorted(by_name[name], key=lambda item: (item[0], str(item[1]))):
+                labels = f'stage="{stage}"'
+                if label is not None:
+                    labels += f',{label_names.get(name, "label")}="{label}"'
+                lines.append(f"{metric}{{{labels}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port=9100, host="127.0.0.1"):
+        """Serve ``/metrics`` from a background thread; returns the server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📈 Serving metrics on http://{host}:{port}/metrics")
+        return server
+
+    @contextlib.contextmanager
+    def profile(self, path=None, top=30):
+        """cProfile the block; yields a dict whose ``"report"`` is filled in on exit.
+
+        With ``path`` the raw stats are also dumped for snakeviz/pstats. Only
+        the calling thread is profiled.
+        """
+        profiler = cProfile.Profile()
+        result = {}
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            if path:
+                profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            result["report"] = out.getvalue()
+
+
+metrics = Metrics()
+_configured = False
+
+
+def configure_from_env():
+    """Hook up sinks from METRICS_JSONL / METRICS_PORT (once per process)"""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    if os.getenv("METRICS_JSONL"):
+        metrics.add_sink(JsonlSink(os.getenv("METRICS_JSONL")))
+    if os.getenv("METRICS_PORT"):
+        metrics.serve_prometheus(int(os.getenv("METRICS_PORT")))
@@ -0,0 +1,197 @@
+# job_index.py - Persistent near-duplicate index of jobs we've already written emails for
+import hashlib
+import json
+import re
+import threading
+import time
+
+from db import connect
+
+_WORD = re.compile(r"[a-z0-9]+")
+BITS = 64
+BANDS = 8
+BAND_BITS = BITS // BANDS
+SENDER_FIELDS = ("person_name", "company_name", "person_role")
+
+
+def normalize_role(text):
+    """Lowercased words of a role or experience string ("Data Engineer II" -> "data engineer ii")"""
+    return " ".join(_WORD.findall(str(text or "").lower()))
+
+
+def job_key(job):
+    """The exact-match part of a job's identity: normalized role and experience.
+
+    SimHash alone can't tell "Data Engineer II" from "Senior Data Engineer"
+    when the descriptions match, so near-duplicates must also agree on this.
+    """
+    return f"{normalize_role(job.get('role'))}\x00{normalize_role(job.get('experience'))}"
+
+
+def normalize_job(job):
+    """Lowercased word list for a job's role, skills and description"""
+    skills = job.get("skills") or []
+    if isinstance(skills, list):
+        skills = " ".join(map(str, skills))
+    text = " ".join(str(part) for part in (job.get("role", ""), skills, job.get("description", "")))
+    return _WORD.findall(text.lower())
+
+
+def simhash(words, shingle=1):
+    """64-bit SimHash over word shingles; similar texts get hashes a few bits apart.
+
+    Single words separate reposts from different jobs best on short postings,
+    where longer shingles make every small edit flip many features.
+    """
+    if len(words) < shingle:
+        features = [" ".join(words)] if words else [""]
+    else:
+        features = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    weights = [0] * BITS
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def _bands(value):
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & ((1 << BITS) - 1)).count("1")
+
+
+def repersonalize(email, old_sender, new_sender):
+    """Swap the previous sender's name, company and role for the new ones.
+
+    Only whole-word occurrences are replaced, all in one pass, so an old
+    name "Al" leaves "Also" alone and one field's new value is never
+    rewritten by another field's swap.
+    """
+    swaps = {}
+    for field in SENDER_FIELDS:
+        old, new = old_sender.get(field), new_sender.get(field)
+        if old and new and old != new:
+            swaps[old] = new
+    if not swaps:
+        return email
+    # Longest first, so "Data Labs Inc" is swapped before "Data Labs" could match
+    alternatives = "|".join(re.escape(old) for old in sorted(swaps, key=len, reverse=True))
+    return re.sub(rf"(?<!\w)(?:{alternatives})(?!\w)", lambda m: swaps[m.group(0)], email)
+
+
+class JobIndex:
+    """SQLite-backed SimHash index mapping job postings to their generated emails.
+
+    Two jobs count as the same posting when they have the same normalized
+    role and experience (see job_key) and their SimHashes differ in at most
+    ``max_distance`` bits. The hash is split into eight 8-bit bands
+    stored in indexed columns, so with ``max_distance`` <= 7 every near
+    duplicate shares at least one band and lookups only scan those rows.
+    """
+
+    def __init__(self, path="job_index.sqlite3", max_distance=6, max_entries=100000):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(BANDS))
+        self._conn = connect(path, [
+            f"""CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                simhash INTEGER NOT NULL,
+                {band_columns},
+                role TEXT,
+                email TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                links TEXT,
+                created_at REAL NOT NULL,
+                job_key TEXT
+            )""",
+        ])
+        # Indexes written before job_key existed get the column added; their
+        # rows have no key and so are never matched again
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "job_key" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN job_key TEXT")
+        for i in range(BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_jobs_band{i} ON jobs(band{i})")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(job_key)")
+        self._conn.commit()
+
+    def fingerprint(self, job):
+        return simhash(normalize_job(job))
+
+    def is_duplicate(self, job, other, fingerprint=None, other_fingerprint=None):
+        """Whether two jobs (e.g. on the same page) count as the same posting"""
+        if job_key(job) != job_key(other):
+            return False
+        value = self.fingerprint(job) if fingerprint is None else fingerprint
+        other_value = self.fingerprint(other) if other_fingerprint is None else other_fingerprint
+        return hamming_distance(value, other_value) <= self.max_distance
+
+    def find(self, job, fingerprint=None):
+        """Closest stored job with the same role and experience within ``max_distance`` bits, or None"""
+        value = self.fingerprint(job) if fingerprint is None else fingerprint
+        bands = _bands(value)
+        where = " OR ".join(f"band{i} = ?" for i in range(BANDS))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, simhash, role, email, sender, links FROM jobs WHERE job_key = ? AND ({where})",
+                [job_key(job), *bands],
+            ).fetchall()
+        best = None
+        for row_id, stored, role, email, sender, links in rows:
+            distance = hamming_distance(stored, value)
+            if distance <= self.max_distance and (best is None or distance < best["distance"]):
+                best = {
+                    "id": row_id,
+                    "distance": distance,
+                    "role": role,
+                    "email": email,
+                    "sender": json.loads(sender),
+                    "links": json.loads(links) if links else [],
+                }
+        return best
+
+    def lookup_email(self, job, sender, fingerprint=None, links=None):
+        """The stored email for a near-duplicate of ``job``, adapted to ``sender``, or None.
+
+        When ``links`` are given, an email that cites different portfolio
+        links is not reused, since it would point at the wrong projects.
+        """
+        match = self.find(job, fingerprint)
+        if match is None:
+            return None
+        if links is not None and set(match["links"]) != set(links):
+            return None
+        return repersonalize(match["email"], match["sender"], sender)
+
+    def add(self, job, email, sender, links=None, fingerprint=None):
+        value = self.fingerprint(job) if fingerprint is None else fingerprint
+        sender = {field: sender.get(field) for field in SENDER_FIELDS}
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs (simhash, {', '.join(f'band{i}' for i in range(BANDS))}, "
+                f"role, email, sender, links, created_at, job_key) VALUES ({', '.join('?' * (BANDS + 7))})",
+                [_signed(value), *_bands(value), job.get("role"), email,
+                 json.dumps(sender), json.dumps(links or []), time.time(), job_key(job)],
+            )
+            # Keep the index bounded by dropping the oldest entries
+            self._conn.execute(
+                "DELETE FROM jobs WHERE id <= (SELECT MAX(id) FROM jobs) - ?", (self.max_entries,)
+            )
+            self._conn.commit()
@@ -0,0 +1,337 @@
+# job_queue.py - Durable SQLite queue of URL submissions and the workers that drain it
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+
+from db import connect
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+# Tells this process apart from an earlier one that happened to get the same pid
+_BOOT = uuid.uuid4().hex[:8]
+
+
+def worker_id(name):
+    """``host:pid:boot:name``, enough to check later whether the worker is still alive"""
+    return f"{socket.gethostname()}:{os.getpid()}:{_BOOT}:{name}"
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        import ctypes
+        # os.kill(pid, 0) would terminate the process on Windows
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _worker_dead(worker):
+    """True only when ``worker`` ran on this host and its process is gone"""
+    parts = worker.split(":")
+    if len(parts) < 4 or parts[0] != socket.gethostname() or not parts[1].isdigit():
+        return False
+    pid = int(parts[1])
+    if pid == os.getpid():
+        return parts[2] != _BOOT
+    return not _pid_alive(pid)
+
+
+class JobQueue:
+    """SQLite-backed work queue shared by the UI and any number of workers.
+
+    Tasks survive Streamlit reruns, browser refreshes and process restarts.
+    A worker claims a task atomically and heartbeats it while working.
+    Tasks left ``running`` by a worker whose process is gone
+    (requeue_dead) or that stopped heartbeating (requeue_stale) are put
+    back on the queue.
+    """
+
+    def __init__(self, path="job_queue.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit, so claim() can take the write lock with BEGIN IMMEDIATE
+        self._conn = connect(path, [
+            """CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, created_at)",
+        ], timeout=30, isolation_level=None)
+
+    def enqueue(self, url, sender):
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tasks (id, url, sender, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, url, json.dumps(sender), QUEUED, now, now),
+            )
+        return task_id
+
+    def claim(self, worker):
+        """Atomically take the oldest queued task, or return None"""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers
+            # (threads or processes) can never claim the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM tasks WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, worker = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, worker, now, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0])
+
+    def complete(self, task_id, result):
+        self._finish(task_id, DONE, result=json.dumps(result, ensure_ascii=False))
+
+    def fail(self, task_id, error):
+        self._finish(task_id, ERROR, error=str(error))
+
+    def _finish(self, task_id, status, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), task_id),
+            )
+
+    def heartbeat(self, task_id, worker):
+        """Record that ``worker`` is still processing ``task_id``"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET updated_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                (time.time(), task_id, RUNNING, worker),
+            )
+
+    def requeue_stale(self, stale_after=120, max_attempts=3):
+        """Put back ``running`` tasks that have had no heartbeat for ``stale_after`` seconds"""
+        return self._requeue("updated_at < ?", [time.time() - stale_after], max_attempts)
+
+    def requeue_dead(self, max_attempts=3):
+        """Put back ``running`` tasks whose worker process on this host has exited"""
+        with self._lock:
+            workers = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT worker FROM tasks WHERE status = ? AND worker IS NOT NULL", (RUNNING,)
+            )]
+        dead = [worker for worker in workers if _worker_dead(worker)]
+        if not dead:
+            return 0
+        return self._requeue(f"worker IN ({', '.join('?' * len(dead))})", dead, max_attempts)
+
+    def _requeue(self, condition, params, max_attempts):
+        now = time.time()
+        with self._lock:
+            # A task that keeps killing its worker is failed rather than retried forever
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, error = 'Gave up after repeated worker crashes', updated_at = ? "
+                f"WHERE status = ? AND attempts >= ? AND {condition}",
+                [ERROR, now, RUNNING, max_attempts, *params],
+            )
+            cursor = self._conn.execute(
+                f"UPDATE tasks SET status = ?, worker = NULL, updated_at = ? WHERE status = ? AND {condition}",
+                [QUEUED, now, RUNNING, *params],
+            )
+        return cursor.rowcount
+
+    def get(self, task_id):
+        tasks = self.get_many([task_id])
+        return tasks[0] if tasks else None
+
+    def get_many(self, task_ids):
+        """Tasks for ``task_ids`` as dicts, in the order given (unknown ids skipped)"""
+        if not task_ids:
+            return []
+        placeholders = ", ".join("?" * len(task_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, url, sender, status, result, error, attempts, created_at, updated_at "
+                f"FROM tasks WHERE id IN ({placeholders})",
+                list(task_ids),
+            ).fetchall()
+        by_id = {}
+        for task_id, url, sender, status, result, error, attempts, created_at, updated_at in rows:
+            by_id[task_id] = {
+                "id": task_id,
+                "url": url,
+                "sender": json.loads(sender),
+                "status": status,
+                "result": json.loads(result) if result else None,
+                "error": error,
+                "attempts": attempts,
+                "created_at": created_at,
+                "updated_at": updated_at,
+            }
+        return [by_id[task_id] for task_id in task_ids if task_id in by_id]
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def process_task(task, chain, portfolio, job_index=None):
+    """Run the full pipeline for one queued URL and return its result payload"""
+    from instrumentation import metrics
+    from pipeline import fetch_page, extract_jobs, retrieve_links, write_job_emails
+
+    with metrics.job(task["id"]):
+        page_html, cleaned_text = fetch_page(task["url"])
+        if not cleaned_text:
+            raise ValueError("Could not load content from the URL")
+        jobs = extract_jobs(chain, page_html, cleaned_text, task["url"])
+        if not jobs:
+            return {"jobs": []}
+        links_per_job = retrieve_links(portfolio, jobs)
+        return {"jobs": write_job_emails(chain, jobs, links_per_job, task["sender"], job_index)}
+
+
+def _worker_loop(queue_path, name, stop, poll_interval, sync_portfolio=True,
+                 heartbeat_interval=10, sweep_interval=60):
+    from resources import get_chain, get_portfolio, get_job_index
+
+    queue = JobQueue(queue_path)
+    worker = worker_id(name)
+    current = [None]
+
+    def beat():
+        while not stop.wait(heartbeat_interval):
+            if current[0] is not None:
+                queue.heartbeat(current[0], worker)
+
+    threading.Thread(target=beat, daemon=True, name=f"{name}-heartbeat").start()
+    last_sweep = 0.0
+    while not stop.is_set():
+        # Any live worker recovers tasks abandoned by crashed ones
+        if time.monotonic() - last_sweep > sweep_interval:
+            recovered = queue.requeue_dead() + queue.requeue_stale()
+            if recovered:
+                print(f"🔁 Re-queued {recovered} task(s) abandoned by another worker")
+            last_sweep = time.monotonic()
+        task = queue.claim(worker)
+        if task is None:
+            stop.wait(poll_interval)
+            continue
+        current[0] = task["id"]
+        try:
+            result = process_task(task, get_chain(), get_portfolio(sync=sync_portfolio), get_job_index())
+        except Exception as e:
+            print(f"❌ Task {task['id'][:8]} failed: {e}")
+            queue.fail(task["id"], e)
+        else:
+            queue.complete(task["id"], result)
+        finally:
+            current[0] = None
+
+
+class WorkerPool:
+    """Threads or processes that drain a JobQueue in the background.
+
+    Thread workers share the process-wide Chain/Portfolio from resources.py;
+    process workers each build their own, which sidesteps the GIL for
+    parsing-heavy pages at the cost of a per-process rate limit budget.
+    The vector store directory must only be written by one process, so in
+    process mode the parent syncs the portfolio before starting workers
+    and the children open it for queries only.
+    """
+
+    def __init__(self, queue_path="job_queue.sqlite3", workers=2, mode="thread", poll_interval=1.0):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode: {mode}")
+        self.queue_path = queue_path
+        self.workers = workers
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self._runners = []
+        self._stop = None
+
+    def start(self):
+        if self._runners or self.workers <= 0:
+            return self
+        queue = JobQueue(self.queue_path)
+        recovered = queue.requeue_dead() + queue.requeue_stale()
+        if recovered:
+            print(f"🔁 Re-queued {recovered} task(s) left running by a previous worker")
+        if self.mode == "thread":
+            self._stop = threading.Event()
+            runner = threading.Thread
+        else:
+            from resources import get_portfolio
+            get_portfolio()
+            # Spawn rather than fork: the parent may hold SQLite connections
+            # and client threads that must not be copied into children
+            context = multiprocessing.get_context("spawn")
+            self._stop = context.Event()
+            runner = context.Process
+        for i in range(self.workers):
+            name = f"{self.mode}-{i}"
+            r = runner(target=_worker_loop,
+                       args=(self.queue_path, name, self._stop, self.poll_interval, self.mode == "thread"),
+                       daemon=True, name=f"email-worker-{i}")
+            r.start()
+            self._runners.append(r)
+        print(f"👷 Started {self.workers} {self.mode} worker(s) on {self.queue_path}")
+        return self
+
+    def stop(self, timeout=None):
+        if self._stop is not None:
+            self._stop.set()
+        for r in self._runners:
+            r.join(timeout)
+        self._runners = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run background email workers against the job queue")
+    parser.add_argument("--queue", default=os.getenv("JOB_QUEUE_PATH", "job_queue.sqlite3"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    args = parser.parse_args(argv)
+
+    pool = WorkerPool(args.queue, workers=args.workers, mode=args.mode).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("🛑 Stopping workers...")
+        pool.stop(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
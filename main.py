@@ -1,17 +1,69 @@
 import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
-from chains import Chain
-from portfolio import Portfolio
-from helpers import clean_text
+from resources import get_chain, get_portfolio, get_job_index, get_job_queue, get_worker_pool
+from pipeline import fetch_page, extract_jobs
+from instrumentation import metrics, configure_from_env
 import hashlib
+import asyncio
+import contextlib
+import uuid
 
-def create_streamlit_app(llm, portfolio):
+def show_background_tasks(queue, company_name, task_ids):
+    """Status and results of this browser's queued submissions, newest first"""
+    tasks = queue.get_many(task_ids)
+    st.subheader("🗂️ Background Jobs")
+    for task in reversed(tasks):
+        task_id = task["id"]
+        if task["status"] == "queued":
+            st.info(f"⏳ Queued: {task['url']}")
+        elif task["status"] == "running":
+            st.info(f"⚙️ Working on: {task['url']}")
+        elif task["status"] == "error":
+            st.error(f"❌ {task['url']}: {task['error']}")
+        elif not task["result"]["jobs"]:
+            st.warning(f"⚠️ No job details found in {task['url']}")
+        else:
+            with st.expander(f"✅ {task['url']}", expanded=True):
+                for idx, item in enumerate(task["result"]["jobs"]):
+                    job = item["job"]
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.subheader("📋 Job Details")
+                        st.json(job)
+                    with col2:
+                        st.subheader("📧 Generated Email")
+                        if item["reused"]:
+                            st.caption("♻️ Reused from a near-identical posting")
+                        st.text_area("Email Content", item["email"], height=400,
+                                     key=f"task_area_{task_id}_{idx}")
+                        st.download_button(
+                            label="📥 Download Email",
+                            data=item["email"],
+                            file_name=f"cold_email_{company_name.replace(' ', '_')}_{task_id[:8]}_{idx}.txt",
+                            mime="text/plain",
+                            key=f"task_download_{task_id}_{idx}"
+                        )
+                    if item["links"]:
+                        st.subheader("🔗 Relevant Portfolio Links")
+                        for link_idx, link in enumerate(item["links"][:3]):
+                            st.markdown(f"{link_idx + 1}. {link}")
+                    st.divider()
+    
+    # Once everything has settled, rerun the page so polling stops
+    if st.session_state.get("polling_tasks") and all(t["status"] in ("done", "error") for t in tasks):
+        st.session_state.polling_tasks = False
+        st.rerun()
+
+def create_streamlit_app(llm, portfolio, job_index, queue=None):
     st.title("📧 AI Cold Email Generator")
     
     # 🚨 ADD THIS: Track last processed URL
     if 'last_processed_url' not in st.session_state:
         st.session_state.last_processed_url = None
     
+    # Background submissions are kept in the URL too, so a refresh finds them again
+    if 'task_ids' not in st.session_state:
+        st.session_state.task_ids = [t for t in st.query_params.get("tasks", "").split(",") if t]
+    
     # Sidebar for user details
     with st.sidebar:
         st.header("👤 Your Details")
@@ -26,6 +78,15 @@ def create_streamlit_app(llm, portfolio):
         phone_number = st.text_input("Phone", "")
         website = st.text_input("Website", "")
         
+        st.markdown("---")
+        st.subheader("⚙️ Generation")
+        email_concurrency = st.slider("Emails generated in parallel", 1, 16, 4)
+        run_in_background = st.toggle(
+            "Process in background", queue is not None, disabled=queue is None,
+            help="Queue the URL for the worker pool instead of waiting on this page"
+        )
+        profile_request = st.checkbox("🧪 Profile next request (cProfile)", False)
+        
         st.markdown("---")
         st.info("💡 Your name, company, and role will be used in the generated emails.")
     
@@ -36,74 +97,81 @@ def create_streamlit_app(llm, portfolio):
     
     submit_button = st.button("🚀 Generate Email", type="primary", use_container_width=True)
     
-    # Initialize session state for tracking processed jobs
-    if 'processed_jobs' not in st.session_state:
-        st.session_state.processed_jobs = set()
-    
     # 🚨 CHANGE THIS: Add URL check to prevent re-processing
     should_process = (submit_button and 
                      url_input and 
                      url_input != st.session_state.last_processed_url)
     
-    if should_process:
+    if should_process and run_in_background:
+        st.session_state.last_processed_url = url_input
+        sender = {
+            "person_name": person_name,
+            "company_name": company_name,
+            "person_role": person_role
+        }
+        task_id = queue.enqueue(url_input, sender)
+        st.session_state.task_ids.append(task_id)
+        st.query_params["tasks"] = ",".join(st.session_state.task_ids)
+        st.success("📬 Queued! Results will appear below when ready.")
+    
+    elif should_process:
         # 🚨 ADD THIS: Store the URL we're about to process
         st.session_state.last_processed_url = url_input
         
-        with st.spinner("Analyzing job description and generating email..."):
+        # Tag every stage of this request so its timings can be shown below
+        request_id = f"{url_input}#{uuid.uuid4().hex[:8]}"
+        profiler = metrics.profile() if profile_request else contextlib.nullcontext({})
+        
+        with st.spinner("Analyzing job description and generating email..."), \
+                metrics.job(request_id), profiler as profile:
             try:
                 # Load and clean webpage content
-                loader = WebBaseLoader([url_input])
-                data = loader.load()
-                if data:
-                    cleaned_data = clean_text(data[0].page_content)
-                    
-                    # Load portfolio
-                    portfolio.load_portfolio()
-                    
-                    # Extract job details
-                    jobs = llm.extract_jobs(cleaned_data)
+                page_html, cleaned_data = fetch_page(url_input)
+                if cleaned_data:
+                    # Extract job details (JSON-LD when present, otherwise the LLM)
+                    jobs = extract_jobs(llm, page_html, cleaned_data, url_input)
                     
                     if jobs:
                         # Create a hash of the URL to use as a base key
                         url_hash = hashlib.md5(url_input.encode()).hexdigest()[:8]
                         
-                        # Filter out duplicates (if any)
+                        # Collapse near-duplicate postings on this page (SimHash)
                         unique_jobs = []
-                        seen_job_keys = set()
+                        fingerprints = []
                         
                         for job in jobs:
-                            # Create a unique key for this job
-                            job_key = f"{job.get('role', '')}_{job.get('company', '')}"
-                            job_hash = hashlib.md5(job_key.encode()).hexdigest()[:8]
-                            
-                            if job_hash not in seen_job_keys:
-                                seen_job_keys.add(job_hash)
-                                unique_jobs.append((job, job_hash))
-                        
-                        for idx, (job, job_hash) in enumerate(unique_jobs):
-                            # Check if we've already processed this job
-                            if job_hash in st.session_state.processed_jobs:
+                            fingerprint = job_index.fingerprint(job)
+                            if any(job_index.is_duplicate(job, seen_job, fingerprint, seen)
+                                   for (seen_job, _), seen in zip(unique_jobs, fingerprints)):
                                 continue
-                            
-                            skills = job.get('skills', [])
-                            
-                            # Query portfolio for matching skills
-                            links = portfolio.query_links(skills)
-                            
-                            # Generate email with DYNAMIC PARAMETERS
-                            email = llm.write_mail(
-                                job, 
-                                links,
-                                person_name=person_name,
-                                company_name=company_name,
-                                person_role=person_role
-                            )
-                            
-                            # Store in session state
-                            st.session_state.processed_jobs.add(job_hash)
-                            
-                            # Display results
-                            st.success(f"✅ Email Generated for: {job.get('role', 'Position')}")
+                            fingerprints.append(fingerprint)
+                            unique_jobs.append((job, f"{fingerprint:016x}_{len(unique_jobs)}"))
+                        
+                        # Query portfolio for every job's skills in one round
+                        links_per_job = portfolio.query_links_batch(
+                            [job.get('skills', []) for job, _ in unique_jobs]
+                        )
+                        
+                        # Reuse emails already written for near-identical postings
+                        # with the same links, from any session or job board,
+                        # instead of calling the LLM
+                        sender = {
+                            "person_name": person_name,
+                            "company_name": company_name,
+                            "person_role": person_role
+                        }
+                        emails = [
+                            job_index.lookup_email(job, sender, fingerprint, links)
+                            for (job, _), fingerprint, links in zip(unique_jobs, fingerprints, links_per_job)
+                        ]
+                        reused = [email is not None for email in emails]
+                        
+                        # Lay out every job's panel up front so emails can stream in side by side
+                        panels = []
+                        for idx, ((job, job_hash), links) in enumerate(zip(unique_jobs, links_per_job)):
+                            status = st.empty()
+                            if not reused[idx]:
+                                status.info(f"✍️ Writing email for: {job.get('role', 'Position')}")
                             
                             col1, col2 = st.columns(2)
                             
@@ -113,6 +181,48 @@ def create_streamlit_app(llm, portfolio):
                             
                             with col2:
                                 st.subheader("📧 Generated Email")
+                                email_slot = st.empty()
+                            
+                            # Show portfolio links if available
+                            if links:
+                                st.subheader("🔗 Relevant Portfolio Links")
+                                for link_idx, link in enumerate(links[:3]):
+                                    st.markdown(f"{link_idx + 1}. {link}")
+                            
+                            # Add a separator between multiple jobs
+                            if idx < len(unique_jobs) - 1:
+                                st.divider()
+                            
+                            panels.append((status, email_slot))
+                        
+                        # Generate the remaining emails concurrently with DYNAMIC PARAMETERS,
+                        # streaming tokens into each job's panel as they arrive
+                        pending = [idx for idx, was_reused in enumerate(reused) if not was_reused]
+                        if pending:
+                            generated = asyncio.run(llm.astream_mails(
+                                [unique_jobs[idx][0] for idx in pending],
+                                [links_per_job[idx] for idx in pending],
+                                on_token=lambda pos, text: panels[pending[pos]][1].markdown(text),
+                                max_concurrency=email_concurrency,
+                                **sender
+                            ))
+                            for idx, email in zip(pending, generated):
+                                emails[idx] = email
+                        
+                        for idx, ((job, job_hash), (status, email_slot), email) in enumerate(zip(unique_jobs, panels, emails)):
+                            if isinstance(email, Exception):
+                                status.error(f"❌ Could not generate email for: {job.get('role', 'Position')} ({email})")
+                                email_slot.empty()
+                                continue
+                            
+                            if reused[idx]:
+                                status.success(f"♻️ Reused email from a near-identical posting: {job.get('role', 'Position')}")
+                            else:
+                                # Remember it so reposts of this job skip the LLM
+                                job_index.add(job, email, sender, links_per_job[idx], fingerprints[idx])
+                                status.success(f"✅ Email Generated for: {job.get('role', 'Position')}")
+                            
+                            with email_slot.container():
                                 email_display = st.text_area(
                                     "Email Content", 
                                     email, 
@@ -128,16 +238,6 @@ def create_streamlit_app(llm, portfolio):
                                     mime="text/plain",
                                     key=f"download_{url_hash}_{job_hash}"
                                 )
-                            
-                            # Show portfolio links if available
-                            if links:
-                                st.subheader("🔗 Relevant Portfolio Links")
-                                for link_idx, link in enumerate(links[:3]):
-                                    st.markdown(f"{link_idx + 1}. {link}")
-                            
-                            # Add a separator between multiple jobs
-                            if idx < len(unique_jobs) - 1:
-                                st.divider()
                     else:
                         st.warning("⚠️ No job details found in the URL.")
                 else:
@@ -146,6 +246,18 @@ def create_streamlit_app(llm, portfolio):
             except Exception as e:
                 st.error(f"❌ An Error Occurred: {str(e)}")
                 st.info("Make sure the URL is accessible and contains job information.")
+        
+        # Per-stage timing, token and cache breakdown for this request
+        events = metrics.events_for(request_id)
+        if events:
+            with st.expander("⏱️ Timing breakdown"):
+                st.dataframe([
+                    {key: value for key, value in event.items() if key not in ("job", "ts")}
+                    for event in events
+                ])
+        if profile.get("report"):
+            with st.expander("🧪 Profile"):
+                st.code(profile["report"])
     
     # 🚨 ADD THIS: Show message if same URL is submitted again
     elif submit_button and url_input == st.session_state.last_processed_url:
@@ -153,6 +265,14 @@ def create_streamlit_app(llm, portfolio):
     
     elif submit_button:
         st.warning("⚠️ Please enter a URL first.")
+    
+    if queue is not None and st.session_state.task_ids:
+        # Poll only while something is still queued or running
+        statuses = [task["status"] for task in queue.get_many(st.session_state.task_ids)]
+        st.session_state.polling_tasks = any(status in ("queued", "running") for status in statuses)
+        st.fragment(show_background_tasks, run_every=2 if st.session_state.polling_tasks else None)(
+            queue, company_name, st.session_state.task_ids
+        )
 
 if __name__ == "__main__":
     # Set page config first
@@ -163,17 +283,21 @@ if __name__ == "__main__":
         initial_sidebar_state="expanded"
     )
     
-    # Initialize components
+    # Initialize components (built once per process, reused on every rerun)
     try:
-        chain = Chain()
-        portfolio = Portfolio()
+        configure_from_env()
+        chain = get_chain()
+        portfolio = get_portfolio()
+        job_index = get_job_index()
+        queue = get_job_queue()
+        get_worker_pool()
         
         # Create the app
-        create_streamlit_app(chain, portfolio)
+        create_streamlit_app(chain, portfolio, job_index, queue)
         
     except ImportError as e:
         st.error(f"❌ Missing dependencies: {str(e)}")
-        st.code("pip install streamlit langchain-community beautifulsoup4", language="bash")
+        st.code("pip install streamlit langchain-groq python-dotenv requests chromadb pandas", language="bash")
     
     except Exception as e:
         st.error(f"❌ Initialization Error: {str(e)}")
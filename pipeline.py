@@ -0,0 +1,91 @@
+from helpers import clean_html
+from instrumentation import metrics
+from structured_data import extract_job_postings
+
+DEFAULT_SENDER = {
+    "person_name": "Locket",
+    "company_name": "CogniCore",
+    "person_role": "Business Development Executive",
+}
+
+
+def fetch_page(url, fetcher=None):
+    """Fetch a URL and return ``(raw_html, cleaned_text)`` (both "" if nothing loaded)"""
+    from resources import get_fetcher
+    
+    fetcher = fetcher or get_fetcher()
+    with metrics.stage("fetch") as event:
+        page_html, event["not_modified"] = fetcher.fetch(url)
+        event["bytes"] = len(page_html)
+    if not page_html:
+        return "", ""
+    with metrics.stage("clean") as event:
+        cleaned_text = clean_html(page_html)
+        event["chars"] = len(cleaned_text)
+    return page_html, cleaned_text
+
+
+def extract_jobs(chain, page_html, cleaned_text, url=None, fetcher=None, max_workers=4):
+    """Extract job postings, from JSON-LD when the page has it, else via the LLM.
+
+    With a ``url``, jobs extracted from the same page text on a previous run
+    are returned from the page cache without extracting again. At most
+    ``max_workers`` chunks of a long page are sent to the LLM at once.
+    """
+    with metrics.stage("extract") as event:
+        if url:
+            from fetcher import content_hash
+            from resources import get_fetcher
+            fetcher = fetcher or get_fetcher()
+            text_hash = content_hash(cleaned_text)
+            jobs = fetcher.cached_jobs(url, text_hash)
+            if jobs is not None:
+                event["source"] = "page-cache"
+                event["jobs"] = len(jobs)
+                return jobs
+        jobs = extract_job_postings(page_html)
+        event["source"] = "json-ld"
+        if not jobs and cleaned_text:
+            event["source"] = "llm"
+            jobs = chain.extract_jobs(cleaned_text, max_workers=max_workers)
+        event["jobs"] = len(jobs)
+        if url:
+            fetcher.store_jobs(url, text_hash, jobs)
+        return jobs
+
+
+def retrieve_links(portfolio, jobs):
+    """Retrieve portfolio links for every job in one batched query"""
+    return portfolio.query_links_batch([job.get('skills', []) for job in jobs])
+
+
+def write_job_emails(chain, jobs, links_per_job, sender=None, job_index=None, max_workers=4):
+    """Write emails for all jobs on a page, packing several jobs per LLM call.
+
+    Near-duplicates found in ``job_index`` that cite the same portfolio
+    links reuse their stored email; the rest go through Chain.write_mails
+    (at most ``max_workers`` calls at once) and are added to the index.
+    """
+    sender = {**DEFAULT_SENDER, **(sender or {})}
+    with metrics.stage("write", jobs=len(jobs)) as event:
+        fingerprints = [job_index.fingerprint(job) if job_index else None for job in jobs]
+        emails = [
+            job_index.lookup_email(job, sender, fingerprint, links) if job_index else None
+            for job, fingerprint, links in zip(jobs, fingerprints, links_per_job)
+        ]
+        reused = [email is not None for email in emails]
+        event["reused"] = sum(reused)
+        
+        pending = [i for i, was_reused in enumerate(reused) if not was_reused]
+        if pending:
+            written = chain.write_mails([jobs[i] for i in pending], [links_per_job[i] for i in pending],
+                                        max_workers=max_workers, **sender)
+            for i, email in zip(pending, written):
+                emails[i] = email
+                if job_index:
+                    job_index.add(jobs[i], email, sender, links_per_job[i], fingerprints[i])
+    
+    return [
+        {"job": job, "links": links, "email": email, "reused": was_reused}
+        for job, links, email, was_reused in zip(jobs, links_per_job, emails, reused)
+    ]
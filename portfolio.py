@@ -1,17 +1,82 @@
 # portfolio.py - Fixed for your structure
-import pandas as pd
-import chromadb
-import uuid
+import contextlib
+import hashlib
 import os
 
+from embedding_cache import EmbeddingCache
+from instrumentation import metrics
+
+# Common abbreviations and spellings mapped to one canonical skill name
+SKILL_ALIASES = {
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "js": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "golang": "go",
+    "reactjs": "react",
+    "react.js": "react",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "vue": "vue.js",
+    "vuejs": "vue.js",
+    "express": "express.js",
+    "expressjs": "express.js",
+    "angularjs": "angular",
+    "postgres": "postgresql",
+    "mongo": "mongodb",
+    "mssql": "sql server",
+    "k8s": "kubernetes",
+    "gcp": "google cloud",
+    "amazon web services": "aws",
+    "tf": "tensorflow",
+    "rails": "ruby on rails",
+    "ror": "ruby on rails",
+    "dotnet": ".net",
+    "full stack": "full-stack",
+    "fullstack": "full-stack",
+    "front end": "frontend",
+    "front-end": "frontend",
+    "back end": "backend",
+    "back-end": "backend",
+}
+
+
+def normalize_skill(skill):
+    """Lowercase, collapse whitespace and resolve aliases ("ML" -> "machine learning")"""
+    skill = " ".join(str(skill).lower().split()).rstrip(".;:")
+    return SKILL_ALIASES.get(skill, skill)
+
+
+def skill_query(skills):
+    """Canonical query text for a skill list: normalized, de-duplicated and sorted"""
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    return " ".join(sorted({normalize_skill(s) for s in skills if str(s).strip()}))
+
+
 class Portfolio:
-    def __init__(self):
+    def __init__(self, csv_path="resource/portfolio.csv", vectorstore_path="vectorstore", embedding_cache=None,
+                 backend=None, embedding_function=None):
         # Set the correct path - relative to App folder
-        self.csv_path = "resource/portfolio.csv"
+        self.csv_path = csv_path
+        # "chroma" (default) or "numpy" for the in-process exact search engine
+        self.backend = (backend or os.getenv("PORTFOLIO_BACKEND", "chroma")).lower()
+        
+        # Pass embedding_cache=False to embed every query
+        if embedding_cache is None:
+            embedding_cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3"))
+        self.embedding_cache = embedding_cache or None
         
         print(f"📁 Looking for portfolio at: {self.csv_path}")
         print(f"📁 Current directory: {os.getcwd()}")
         
+        # Heavy imports are deferred until a Portfolio is actually built
+        import pandas as pd
+        
         # Check if file exists
         if os.path.exists(self.csv_path):
             print(f"✅ Found portfolio CSV: {self.csv_path}")
@@ -19,7 +84,7 @@ class Portfolio:
         else:
             # Create directory and sample file
             print(f"⚠️ File not found. Creating directory and sample portfolio...")
-            os.makedirs(os.path.dirname(self.csv_path), exist_ok=True)
+            os.makedirs(os.path.dirname(self.csv_path) or ".", exist_ok=True)
             
             # Create sample data
             self.data = pd.DataFrame({
@@ -40,84 +105,245 @@ class Portfolio:
             print(f"✅ Created sample portfolio at: {self.csv_path}")
         
         print(f"📊 Loaded {len(self.data)} portfolio items")
+        self._build_skill_index()
         
-        # Initialize ChromaDB
+        # Initialize the vector store. The embedding function is held explicitly
+        # so queries can be embedded (and cached) on our side
         try:
-            self.chroma_client = chromadb.PersistentClient('vectorstore')
-            self.collection = self.chroma_client.get_or_create_collection(name="portfolio")
-            print("✅ ChromaDB collection ready")
+            if self.backend == "numpy":
+                # Same model as Chroma's default, without importing chromadb
+                from embeddings import MiniLMEmbeddingFunction
+                from vector_store import NumpyVectorStore
+                self.embedding_function = embedding_function or MiniLMEmbeddingFunction()
+                self.chroma_client = None
+                self.collection = NumpyVectorStore(os.path.join(vectorstore_path, "numpy_portfolio"),
+                                                   self.embedding_function)
+                print(f"✅ NumPy vector store ready ({self.collection.count()} items)")
+            else:
+                import chromadb
+                if embedding_function is None:
+                    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+                    embedding_function = DefaultEmbeddingFunction()
+                self.embedding_function = embedding_function
+                self.chroma_client = chromadb.PersistentClient(vectorstore_path)
+                self.collection = self.chroma_client.get_or_create_collection(
+                    name="portfolio", embedding_function=self.embedding_function
+                )
+                print("✅ ChromaDB collection ready")
         except Exception as e:
-            print(f"⚠️ ChromaDB error: {e}")
+            print(f"⚠️ Vector store error: {e}")
             self.collection = None
 
     def load_portfolio(self):
         """Load portfolio into vector database"""
         if self.collection:
-            if self.collection.count() == 0:
-                print("🔄 Loading portfolio into ChromaDB...")
-                for _, row in self.data.iterrows():
-                    self.collection.add(
-                        documents=row["Techstack"],
-                        metadatas={"links": row["Links"]},
-                        ids=[str(uuid.uuid4())]
-                    )
-                print(f"✅ Loaded {len(self.data)} items into ChromaDB")
-            else:
-                print(f"✅ ChromaDB already has {self.collection.count()} items")
+            self.sync_portfolio()
         else:
-            print("✅ Using local portfolio (no ChromaDB)")
+            print("✅ Using local portfolio (no vector store)")
+
+    def warm_up(self):
+        """Load the embedding model now rather than on the first user query"""
+        if not self.collection:
+            return
+        with metrics.stage("warmup"):
+            self.embedding_function(["warm up"])
+
+    def embed_queries(self, texts):
+        """Embeddings for ``texts``, computing only cache misses (in one batch)"""
+        model = type(self.embedding_function).__name__
+        with metrics.stage("embed", queries=len(texts)) as event:
+            keys = [f"{model}\x00{text}" for text in texts]
+            vectors = self.embedding_cache.get_many(keys) if self.embedding_cache else [None] * len(texts)
+            # Repeated skill sets in one batch are embedded once
+            missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+            event["cache_hits"] = len(texts) - sum(vector is None for vector in vectors)
+            event["embedded"] = len(missing)
+            if missing:
+                computed = {
+                    text: [float(x) for x in vector]
+                    for text, vector in zip(missing, self.embedding_function(missing))
+                }
+                if self.embedding_cache:
+                    self.embedding_cache.put_many([f"{model}\x00{text}" for text in computed], list(computed.values()))
+                vectors = [computed[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def _desired_entries(self):
+        """Map deterministic ids to (document, links, content_hash) for every CSV row"""
+        entries = {}
+        occurrences = {}
+        for techstack, links in zip(self.data["Techstack"], self.data["Links"]):
+            document = str(techstack)
+            links = str(links)
+            # The id is derived from the embedded document, so it only changes
+            # when the row needs re-embedding; repeated techstacks get a suffix
+            doc_hash = hashlib.sha1(document.encode("utf-8")).hexdigest()[:16]
+            n = occurrences.get(doc_hash, 0)
+            occurrences[doc_hash] = n + 1
+            row_id = f"pf-{doc_hash}-{n}"
+            content_hash = hashlib.sha1(f"{document}\x00{links}".encode("utf-8")).hexdigest()
+            entries[row_id] = (document, links, content_hash)
+        return entries
+
+    def _existing_hashes(self, page_size=5000):
+        """Map id -> stored content hash for everything in the collection"""
+        existing = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            for row_id, metadata in zip(ids, page.get("metadatas") or [{}] * len(ids)):
+                existing[row_id] = (metadata or {}).get("content_hash")
+            if len(ids) < page_size:
+                return existing
+            offset += page_size
+
+    def sync_portfolio(self, batch_size=1000):
+        """Bring the collection in line with the CSV, touching only rows that changed.
+
+        New rows are upserted (and embedded), rows whose links changed get a
+        metadata-only update, and ids no longer in the CSV are deleted. An
+        unchanged portfolio costs one paged read of the collection's ids.
+        """
+        desired = self._desired_entries()
+        existing = self._existing_hashes()
+        
+        to_add = [row_id for row_id in desired if row_id not in existing]
+        to_update = [row_id for row_id in desired
+                     if row_id in existing and existing[row_id] != desired[row_id][2]]
+        to_delete = [row_id for row_id in existing if row_id not in desired]
+        
+        if not (to_add or to_update or to_delete):
+            print(f"✅ Vector store already in sync ({len(desired)} items)")
+            return {"added": 0, "updated": 0, "deleted": 0}
+        
+        print(f"🔄 Syncing portfolio: +{len(to_add)} ~{len(to_update)} -{len(to_delete)}")
+        max_batch = getattr(self.chroma_client, "get_max_batch_size", lambda: batch_size)()
+        batch_size = max(1, min(batch_size, max_batch))
+        
+        # The NumPy store writes its files once at the end instead of per batch
+        bulk = getattr(self.collection, "bulk", contextlib.nullcontext)
+        with bulk():
+            for i in range(0, len(to_delete), batch_size):
+                self.collection.delete(ids=to_delete[i:i + batch_size])
+            
+            for i in range(0, len(to_add), batch_size):
+                ids = to_add[i:i + batch_size]
+                self.collection.upsert(
+                    ids=ids,
+                    documents=[desired[row_id][0] for row_id in ids],
+                    metadatas=[{"links": desired[row_id][1], "content_hash": desired[row_id][2]} for row_id in ids]
+                )
+            
+            # Same document means the same embedding, so only metadata is rewritten
+            for i in range(0, len(to_update), batch_size):
+                ids = to_update[i:i + batch_size]
+                self.collection.update(
+                    ids=ids,
+                    metadatas=[{"links": desired[row_id][1], "content_hash": desired[row_id][2]} for row_id in ids]
+                )
+        
+        print(f"✅ Vector store synced: {self.collection.count()} items")
+        return {"added": len(to_add), "updated": len(to_update), "deleted": len(to_delete)}
 
     def query_links(self, skills):
         """Query portfolio for skills and return relevant links"""
-        if not skills:
-            return []
+        return self.query_links_batch([skills])[0]
+
+    def query_links_batch(self, skill_lists, n_results=3, max_links=5):
+        """Return ranked, de-duplicated links for each job's skills.
+
+        Skill sets are normalized so repeats share one cached embedding; the
+        uncached ones are embedded together and every job is searched in a
+        single vector store query. Jobs that get nothing back fall through to the
+        local skill index.
+        """
+        with metrics.stage("retrieve", jobs=len(skill_lists)) as event:
+            return self._query_links_batch(skill_lists, n_results, max_links, event)
+
+    def _query_links_batch(self, skill_lists, n_results, max_links, event):
+        results = [[] for _ in skill_lists]
+        query_texts = []
+        positions = []
+        for position, skills in enumerate(skill_lists):
+            text = skill_query(skills) if skills else ""
+            if text:
+                query_texts.append(text)
+                positions.append(position)
+        
+        if not query_texts:
+            return results
         
-        print(f"🔍 Querying portfolio for skills: {skills}")
+        print(f"🔍 Querying portfolio for {len(query_texts)} skill set(s)")
         
-        # Method 1: Try ChromaDB first
+        # Method 1: Try the vector store first, one query for every job
         if self.collection:
             try:
-                query_text = " ".join(skills) if isinstance(skills, list) else str(skills)
-                results = self.collection.query(
-                    query_texts=[query_text], 
-                    n_results=3
+                response = self.collection.query(
+                    query_embeddings=self.embed_queries(query_texts),
+                    n_results=n_results
                 )
                 
-                links_list = []
-                if results.get('metadatas'):
-                    for metadata_group in results['metadatas']:
-                        for metadata in metadata_group:
-                            if 'links' in metadata:
-                                # Split comma-separated links
-                                links = [link.strip() for link in metadata['links'].split(',')]
-                                links_list.extend(links)
+                for position, metadata_group in zip(positions, response.get('metadatas') or []):
+                    links_list = []
+                    seen = set()
+                    # Results come back closest first, so keep that order
+                    for metadata in metadata_group or []:
+                        if metadata and 'links' in metadata:
+                            # Split comma-separated links
+                            for link in metadata['links'].split(','):
+                                link = link.strip()
+                                if link and link not in seen:
+                                    seen.add(link)
+                                    links_list.append(link)
+                    results[position] = links_list[:max_links]
                 
-                if links_list:
-                    print(f"✅ Found {len(links_list)} links via ChromaDB")
-                    return links_list[:5]
+                found = sum(1 for position in positions if results[position])
+                event["vector_hits"] = found
+                print(f"✅ Found links for {found}/{len(positions)} skill set(s) via the vector store")
                     
             except Exception as e:
-                print(f"⚠️ ChromaDB query failed: {e}")
+                print(f"⚠️ Vector store query failed: {e}")
         
-        # Method 2: Fallback to simple text matching
+        # Method 2: Fallback to the precomputed skill index
+        for position in positions:
+            if not results[position]:
+                event["fallbacks"] = event.get("fallbacks", 0) + 1
+                results[position] = self._match_links(skill_lists[position])[:max_links]
+        
+        return results
+
+    def _build_skill_index(self):
+        """Index normalized skill -> row positions, and parse each row's links once"""
+        self.skill_index = {}
+        self.row_links = []
+        for position, (techstack, links) in enumerate(zip(self.data["Techstack"], self.data["Links"])):
+            for skill in str(techstack).split(','):
+                skill = normalize_skill(skill)
+                if skill:
+                    self.skill_index.setdefault(skill, set()).add(position)
+            self.row_links.append([link.strip() for link in str(links).split(',') if link.strip()])
+
+    def _match_links(self, skills):
+        """Rank rows by how many of ``skills`` they cover and return their links in order"""
+        if isinstance(skills, str):
+            skills = skills.split(',')
+        
+        match_counts = {}
+        for skill in {normalize_skill(s) for s in skills if isinstance(s, str)}:
+            for position in self.skill_index.get(skill, ()):
+                match_counts[position] = match_counts.get(position, 0) + 1
+        
+        # Most matched skills first, CSV order breaks ties
+        ranked = sorted(match_counts, key=lambda position: (-match_counts[position], position))
         links_list = []
-        for _, row in self.data.iterrows():
-            techstack = str(row['Techstack']).lower()
-            row_skills = [skill.strip().lower() for skill in techstack.split(',')]
-            
-            # Check if any skill matches
-            for skill in skills:
-                if isinstance(skill, str) and skill.lower() in row_skills:
-                    # Extract links
-                    row_links = str(row['Links']).split(',')
-                    links_list.extend([link.strip() for link in row_links])
-                    break  # Found a match, move to next row
-        
-        # Remove duplicates and limit
-        unique_links = list(set(links_list))
-        print(f"✅ Found {len(unique_links)} unique links")
-        
-        return unique_links[:5]
+        seen = set()
+        for position in ranked:
+            for link in self.row_links[position]:
+                if link not in seen:
+                    seen.add(link)
+                    links_list.append(link)
+        return links_list
 
 # Test
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+# rate_limiter.py - Shared request/token budgets and priority scheduling for Groq calls
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from instrumentation import metrics
+
+# Lower runs first: extraction unblocks a whole page, an email is one job
+PRIORITY_EXTRACT = 0
+PRIORITY_EMAIL = 1
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is still rate limited after every retry"""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``per_minute / 60`` per second"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` is available (0 if it is now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Charge (or refund) the difference between estimated and actual usage"""
+        self.level = min(self.capacity, self.level - delta)
+
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 responses, judged by status code or exception type only"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    if getattr(getattr(error, "response", None), "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError"
+
+
+def retry_after(error):
+    """The server's Retry-After hint in seconds, if the error carries one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class GroqScheduler:
+    """Gate every LLM call on shared request-per-minute and token-per-minute budgets.
+
+    Callers wait in a priority queue (extraction ahead of email writing,
+    FIFO within a priority) until both buckets can cover the request's
+    estimated tokens. Calls that come back with HTTP 429 are retried with
+    jittered exponential backoff. One instance is shared by the whole
+    process via resources.get_scheduler(), so all Streamlit sessions draw
+    from the same budget.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=12000,
+                 max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, estimated_tokens, priority=PRIORITY_EMAIL):
+        """Block until this request may be sent, then charge it to both budgets"""
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    timeout = None
+                    if self._queue[0] == entry:
+                        now = time.monotonic()
+                        timeout = max(self.requests.wait_time(1, now),
+                                      self.tokens.wait_time(estimated_tokens, now))
+                        if timeout == 0:
+                            self.requests.take(1)
+                            self.tokens.take(estimated_tokens)
+                            return
+                    self._cond.wait(timeout)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    async def acquire_async(self, estimated_tokens, priority=PRIORITY_EMAIL):
+        await asyncio.to_thread(self.acquire, estimated_tokens, priority)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Correct the token budget once the real usage is known"""
+        if actual_tokens:
+            with self._cond:
+                self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def backoff(self, attempt, error=None):
+        """Seconds to wait before retry ``attempt`` (full jitter, capped)"""
+        hinted = retry_after(error) if error is not None else None
+        if hinted is not None:
+            return hinted + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn, estimated_tokens, priority=PRIORITY_EMAIL, stage="llm"):
+        """Run ``fn()`` under the budgets, retrying on rate-limit errors"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated_tokens, priority)
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded(f"Still rate limited after {attempt + 1} attempts: {e}") from e
+                metrics.increment("retries", stage)
+                delay = self.backoff(attempt, e)
+                print(f"⏳ Rate limited, retrying in {delay:.1f}s")
+                time.sleep(delay)
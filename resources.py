@@ -0,0 +1,117 @@
+# resources.py - Process-wide, lazily built Chain and Portfolio
+#
+# Streamlit re-executes main.py on every widget interaction, but imported
+# modules stay loaded, so objects held here survive reruns and are shared by
+# every session in the process. The heavy imports (langchain, chromadb,
+# pandas) only happen on first use.
+import threading
+
+_lock = threading.Lock()
+_instances = {}
+
+
+def _get(name, factory):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+
+def _build_chain():
+    from chains import Chain
+    return Chain()
+
+
+def _build_portfolio(sync=True):
+    from portfolio import Portfolio
+    portfolio = Portfolio()
+    if sync:
+        portfolio.load_portfolio()
+    portfolio.warm_up()
+    return portfolio
+
+
+def get_chain():
+    """Shared Chain (one ChatGroq client per process)"""
+    return _get("chain", _build_chain)
+
+
+def get_portfolio(sync=True):
+    """Shared Portfolio, synced into the vector store once on first use.
+
+    Worker processes pass ``sync=False`` so only their parent writes the
+    store; they open it for queries only.
+    """
+    return _get("portfolio", lambda: _build_portfolio(sync))
+
+
+def get_scheduler():
+    """Shared Groq rate limiter, configured from GROQ_RPM / GROQ_TPM"""
+    def build():
+        import os
+        from rate_limiter import GroqScheduler
+        return GroqScheduler(
+            requests_per_minute=int(os.getenv("GROQ_RPM", "30")),
+            tokens_per_minute=int(os.getenv("GROQ_TPM", "12000")),
+        )
+    return _get("scheduler", build)
+
+
+def get_fetcher():
+    """Shared pooled page fetcher, configured from PAGE_CACHE_PATH / PAGE_CACHE_MAX_BYTES /
+    FETCH_MAX_BYTES / FETCH_PER_HOST"""
+    def build():
+        import os
+        from fetcher import PageFetcher
+        return PageFetcher(
+            cache_path=os.getenv("PAGE_CACHE_PATH", "page_cache.sqlite3"),
+            max_bytes=int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024))),
+            per_host=int(os.getenv("FETCH_PER_HOST", "4")),
+            cache_max_bytes=int(os.getenv("PAGE_CACHE_MAX_BYTES", str(500 * 1024 * 1024))),
+        )
+    return _get("fetcher", build)
+
+
+def get_job_index():
+    """Shared near-duplicate index of jobs we've already written emails for"""
+    def build():
+        import os
+        from job_index import JobIndex
+        return JobIndex(os.getenv("JOB_INDEX_PATH", "job_index.sqlite3"))
+    return _get("job_index", build)
+
+
+def get_job_queue():
+    """Shared handle on the durable queue of background submissions"""
+    def build():
+        import os
+        from job_queue import JobQueue
+        return JobQueue(os.getenv("JOB_QUEUE_PATH", "job_queue.sqlite3"))
+    return _get("job_queue", build)
+
+
+def get_worker_pool():
+    """Background workers draining the job queue, started once per process.
+
+    WORKERS sets the pool size (0 leaves the queue to a separate
+    ``python job_queue.py`` process) and WORKER_MODE picks thread or process.
+    """
+    def build():
+        import os
+        from job_queue import WorkerPool
+        return WorkerPool(
+            os.getenv("JOB_QUEUE_PATH", "job_queue.sqlite3"),
+            workers=int(os.getenv("WORKERS", "2")),
+            mode=os.getenv("WORKER_MODE", "thread"),
+        ).start()
+    return _get("worker_pool", build)
+
+
+def reset():
+    """Drop cached instances so the next call rebuilds them"""
+    with _lock:
+        _instances.clear()
@@ -0,0 +1,111 @@
+# structured_data.py - Read schema.org JobPosting JSON-LD straight from page HTML
+import html as html_lib
+import json
+import re
+
+_JSON_LD = re.compile(
+    r'<script[^>]*type\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+_TAG = re.compile(r'<[^>]+>')
+_SKILL_SPLIT = re.compile(r'[,;\n•|]+')
+
+
+def _iter_nodes(data):
+    """Yield every dict in a JSON-LD document, including @graph and nested lists"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        if "@graph" in data:
+            yield from _iter_nodes(data["@graph"])
+
+
+def _is_job_posting(node):
+    node_type = node.get("@type")
+    types = node_type if isinstance(node_type, list) else [node_type]
+    return any(str(t).split("/")[-1] == "JobPosting" for t in types)
+
+
+def _text(value):
+    """Flatten an HTML-bearing JSON-LD value to plain text"""
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("description") or ""
+    if isinstance(value, list):
+        value = " ".join(_text(v) for v in value)
+    text = _TAG.sub(" ", html_lib.unescape(str(value or "")))
+    return " ".join(text.split())
+
+
+def _experience(value):
+    if isinstance(value, dict):
+        months = value.get("monthsOfExperience")
+        if months not in (None, ""):
+            try:
+                years = float(months) / 12
+                return f"{years:g} years"
+            except (TypeError, ValueError):
+                pass
+        return _text(value.get("description", ""))
+    return _text(value)
+
+
+def _skills(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        parts = _SKILL_SPLIT.split(_text(value))
+    elif isinstance(value, list):
+        parts = [_text(v) for v in value]
+    else:
+        parts = [_text(value)]
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _load(raw):
+    raw = raw.strip()
+    # Some sites wrap the block in CDATA or HTML comments
+    for prefix, suffix in (("<![CDATA[", "]]>"), ("<!--", "-->")):
+        if raw.startswith(prefix) and raw.endswith(suffix):
+            raw = raw[len(prefix):-len(suffix)].strip()
+    try:
+        return json.loads(raw, strict=False)
+    except ValueError:
+        return None
+
+
+def extract_job_postings(page_html):
+    """Return JobPosting entries in the same shape Chain.extract_jobs produces.
+
+    Each job is a dict with ``role``, ``experience``, ``skills`` and
+    ``description``. Postings without a title or description are skipped;
+    an empty list means the page has no usable structured data.
+    """
+    if not page_html or "ld+json" not in page_html:
+        return []
+
+    jobs = []
+    seen = set()
+    for match in _JSON_LD.finditer(page_html):
+        data = _load(match.group(1))
+        if data is None:
+            continue
+        for node in _iter_nodes(data):
+            if not _is_job_posting(node):
+                continue
+            role = _text(node.get("title") or node.get("name"))
+            description = _text(node.get("description"))
+            if not role or not description:
+                continue
+            key = (role.lower(), description[:200].lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            jobs.append({
+                "role": role,
+                "experience": _experience(node.get("experienceRequirements")),
+                "skills": _skills(node.get("skills")),
+                "description": description,
+            })
+    return jobs
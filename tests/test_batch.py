@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+import batch
+from batch import BatchRunner, load_completed_urls
+
+
+class FakePortfolio:
+    def load_portfolio(self):
+        pass
+
+    def query_links_batch(self, skill_sets):
+        return [[] for _ in skill_sets]
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Replace the network and LLM stages with recorders"""
+    calls = {"extract": [], "write": []}
+
+    def fetch_page(url):
+        return f"<html>{url}</html>", f"text of {url}"
+
+    def extract_jobs(chain, page_html, cleaned_text, url=None, fetcher=None, max_workers=4):
+        calls["extract"].append(max_workers)
+        return [{"role": "Data Engineer", "skills": ["Python"]}]
+
+    def write_job_emails(chain, jobs, links_per_job, sender=None, job_index=None, max_workers=4):
+        calls["write"].append(max_workers)
+        return [{"job": job, "links": links, "email": "Hi", "reused": False}
+                for job, links in zip(jobs, links_per_job)]
+
+    monkeypatch.setattr(batch, "fetch_page", fetch_page)
+    monkeypatch.setattr(batch, "extract_jobs", extract_jobs)
+    monkeypatch.setattr(batch, "write_job_emails", write_job_emails)
+    return calls
+
+
+def run(output, urls):
+    runner = BatchRunner(None, FakePortfolio(), str(output), fetch_concurrency=2,
+                         extract_concurrency=2, write_concurrency=2)
+    return asyncio.run(runner.run(urls))
+
+
+def read_records(output):
+    return [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def test_pages_do_not_fan_out_past_the_stage_limit(tmp_path, stages):
+    stats = run(tmp_path / "out.jsonl", [f"https://example.com/{i}" for i in range(5)])
+    assert stats["ok"] == 5
+    assert stages["extract"] == [1] * 5
+    assert stages["write"] == [1] * 5
+
+
+def test_resume_skips_completed_urls(tmp_path, stages):
+    output = tmp_path / "out.jsonl"
+    run(output, ["https://example.com/1"])
+    stats = run(output, ["https://example.com/1", "https://example.com/2"])
+    assert stats["skipped"] == 1 and stats["ok"] == 1
+    assert sorted(r["url"] for r in read_records(output)) == ["https://example.com/1", "https://example.com/2"]
+
+
+
+def test_resume_after_a_truncated_last_line(tmp_path, stages):
+    output = tmp_path / "out.jsonl"
+    run(output, ["https://example.com/1"])
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"url": "https://example.com/2", "sta')  # crashed mid-write
+
+    run(output, ["https://example.com/1", "https://example.com/2"])
+    assert load_completed_urls(str(output)) == {"https://example.com/1", "https://example.com/2"}
+    # The next resume has nothing left to do
+    assert run(output, ["https://example.com/1", "https://example.com/2"])["skipped"] == 2
+
+
+@pytest.mark.parametrize("content, expected", [
+    (b"", b""),
+    (b'{"a": 1}\n', b'{"a": 1}\n'),
+    (b'{"a": 1}\n{"b"', b'{"a": 1}\n'),
+    (b'{"b"', b""),
+])
+def test_trim_partial_line(tmp_path, content, expected):
+    path = tmp_path / "out.jsonl"
+    path.write_bytes(content)
+    batch.trim_partial_line(str(path))
+    assert path.read_bytes() == expected
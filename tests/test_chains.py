@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+pytest.importorskip("langchain_groq")
+
+from chains import merge_jobs  # noqa: E402
+
+
+def test_merge_jobs_collapses_postings_seen_in_two_chunks():
+    first = [{"role": "Data Engineer", "experience": "3 years", "skills": ["Python", "SQL"],
+              "description": "Build pipelines"}]
+    second = [{"role": "data  engineer", "experience": "3 Years", "skills": ["sql", "Airflow"],
+               "description": "Build and run batch pipelines"}]
+    merged = merge_jobs([first, second])
+    assert len(merged) == 1
+    assert merged[0]["skills"] == ["Python", "SQL", "Airflow"]
+    assert merged[0]["description"] == "Build and run batch pipelines"
+
+
+def test_merge_jobs_keeps_distinct_roles():
+    jobs = [[{"role": "Data Engineer", "experience": "3 years"}],
+            [{"role": "Data Engineer", "experience": "5 years"}, {"role": "ML Engineer"}]]
+    assert len(merge_jobs(jobs)) == 3
+
+
+def test_extract_chunks_stay_attributed_to_the_job():
+    from fake_llm import FakeChatModel
+    from chains import Chain
+    from instrumentation import metrics
+
+    page = " ".join(
+        f"Position Data Engineer {i} Skills Python SQL Experience 3 years "
+        f"Description Build pipelines for team {i} with care and rigour Apply now"
+        for i in range(12)
+    )
+    chain = Chain(cache=False, llm=FakeChatModel(latency=0))
+    with metrics.job("page-under-test"):
+        chain.extract_jobs(page, chunk_tokens=60, overlap_tokens=0)
+    extract_events = [e for e in metrics.events_for("page-under-test") if e["stage"] == "llm_extract"]
+    assert len(extract_events) > 1
+
+
+def test_batched_emails_stay_attributed_to_the_job():
+    from fake_llm import FakeChatModel
+    from chains import Chain
+    from instrumentation import metrics
+
+    jobs = [{"role": f"Data Engineer {i}", "skills": ["Python"], "description": "Build pipelines"}
+            for i in range(6)]
+    chain = Chain(cache=False, llm=FakeChatModel(latency=0))
+    with metrics.job("emails-under-test"):
+        emails = chain.write_mails(jobs, [[] for _ in jobs], max_jobs_per_batch=2)
+    assert all(emails)
+    write_events = [e for e in metrics.events_for("emails-under-test") if e["stage"].startswith("llm_write")]
+    assert len(write_events) >= 3
+
+
+def test_batch_budget_follows_the_model_and_rate_limit():
+    from fake_llm import FakeChatModel
+    from chains import DEFAULT_MODEL_LIMITS, MODEL_LIMITS, Chain
+    from rate_limiter import GroqScheduler
+
+    fake = Chain(cache=False, llm=FakeChatModel(latency=0))
+    assert (fake.context_window, fake.max_output_tokens) == DEFAULT_MODEL_LIMITS
+    assert fake._batch_budget() == (int(DEFAULT_MODEL_LIMITS[0] * 0.9), DEFAULT_MODEL_LIMITS[1])
+
+    groq = Chain(cache=False, llm=FakeChatModel(latency=0, model_name="llama-3.3-70b-versatile"),
+                 scheduler=GroqScheduler(tokens_per_minute=12000))
+    assert (groq.context_window, groq.max_output_tokens) == MODEL_LIMITS["llama-3.3-70b-versatile"]
+    assert groq._batch_budget() == (12000, MODEL_LIMITS["llama-3.3-70b-versatile"][1])
+
+
+def test_long_jobs_are_split_across_more_batches(monkeypatch):
+    from fake_llm import FakeChatModel
+    from chains import Chain
+
+    chain = Chain(cache=False, llm=FakeChatModel(latency=0))
+    sizes = []
+    invoke = chain._invoke
+    monkeypatch.setattr(chain, "_invoke", lambda prompt, inputs, **kw: (
+        sizes.append(len(json.loads(inputs["jobs_json"]))) if "jobs_json" in inputs else None,
+        invoke(prompt, inputs, **kw))[1])
+    jobs = [{"role": f"Engineer {i}", "description": "word " * 1500} for i in range(6)]
+    chain.write_mails(jobs, [[] for _ in jobs])
+    # Each job costs over 2000 tokens, so no more than three fit an 8k context
+    assert sizes and max(sizes) <= 3
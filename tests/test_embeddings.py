@@ -0,0 +1,92 @@
+import hashlib
+import io
+import os
+import tarfile
+import urllib.request
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from embeddings import HashEmbeddingFunction, MiniLMEmbeddingFunction  # noqa: E402
+
+
+def make_archive(path):
+    """A stand-in for Chroma's onnx.tar.gz holding every expected file"""
+    with tarfile.open(path, "w:gz") as tar:
+        for name in MiniLMEmbeddingFunction.FILES:
+            data = f"contents of {name}".encode("utf-8")
+            info = tarfile.TarInfo(f"onnx/{name}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def served_archive(tmp_path, monkeypatch):
+    """Serve a local archive in place of the real download; returns the download count"""
+    source = str(tmp_path / "source.tar.gz")
+    monkeypatch.setattr(MiniLMEmbeddingFunction, "SHA256", make_archive(source))
+    downloads = []
+
+    def urlretrieve(url, filename):
+        downloads.append(url)
+        with open(source, "rb") as src, open(filename, "wb") as dst:
+            dst.write(src.read())
+
+    monkeypatch.setattr(urllib.request, "urlretrieve", urlretrieve)
+    return downloads
+
+
+def test_download_extracts_every_file(tmp_path, served_archive):
+    model_dir = MiniLMEmbeddingFunction(cache_dir=str(tmp_path / "cache"))._model_dir()
+    assert sorted(os.listdir(model_dir)) == sorted(MiniLMEmbeddingFunction.FILES)
+    assert len(served_archive) == 1
+
+
+def test_partial_model_dir_is_replaced(tmp_path, served_archive):
+    cache = tmp_path / "cache"
+    (cache / "onnx").mkdir(parents=True)
+    (cache / "onnx" / "model.onnx").write_bytes(b"half a model")
+
+    model_dir = MiniLMEmbeddingFunction(cache_dir=str(cache))._model_dir()
+    assert sorted(os.listdir(model_dir)) == sorted(MiniLMEmbeddingFunction.FILES)
+    assert (cache / "onnx" / "model.onnx").read_bytes() == b"contents of model.onnx"
+
+
+def test_verified_archive_is_reused(tmp_path, served_archive):
+    cache = tmp_path / "cache"
+    MiniLMEmbeddingFunction(cache_dir=str(cache))._model_dir()
+    (cache / "onnx" / "vocab.txt").unlink()
+    MiniLMEmbeddingFunction(cache_dir=str(cache))._model_dir()
+    assert len(served_archive) == 1
+
+
+def test_checksum_mismatch_is_rejected(tmp_path, served_archive, monkeypatch):
+    monkeypatch.setattr(MiniLMEmbeddingFunction, "SHA256", "0" * 64)
+    cache = tmp_path / "cache"
+    with pytest.raises(ValueError, match="SHA-256"):
+        MiniLMEmbeddingFunction(cache_dir=str(cache))._model_dir()
+    assert not (cache / "onnx").exists()
+    assert os.listdir(cache) == []
+
+
+def test_hash_embeddings_are_unit_length_and_deterministic():
+    first = HashEmbeddingFunction()(["python, django, sql", ""])
+    second = HashEmbeddingFunction()(["python, django, sql", ""])
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+    assert np.array_equal(first[0], second[0])
+
+
+def test_minilm_matches_chroma_default():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    embedding_functions = pytest.importorskip("chromadb.utils.embedding_functions")
+
+    texts = ["python, django, sql", "react, typescript", "machine learning, tensorflow, python"]
+    ours = np.stack(MiniLMEmbeddingFunction()(texts))
+    theirs = np.stack([np.asarray(v, dtype=np.float32) for v in embedding_functions.DefaultEmbeddingFunction()(texts)])
+    assert ours.shape == theirs.shape == (3, 384)
+    assert np.allclose(ours, theirs, atol=1e-5)
@@ -0,0 +1,39 @@
+from helpers import chunk_text, estimate_tokens
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("Senior Python Developer") == ["Senior Python Developer"]
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text("   ") == []
+
+
+def test_chunks_respect_budget_and_keep_every_word():
+    words = [f"word{i}" for i in range(2000)]
+    chunks = chunk_text(" ".join(words), max_tokens=100, overlap_tokens=10)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 * 4 for chunk in chunks)
+    seen = [word for chunk in chunks for word in chunk.split()]
+    assert set(seen) == set(words)
+
+
+def test_consecutive_chunks_overlap():
+    text = " ".join(f"word{i}" for i in range(500))
+    chunks = chunk_text(text, max_tokens=50, overlap_tokens=10)
+    for first, second in zip(chunks, chunks[1:]):
+        assert first.split()[-1] in second.split()
+
+
+def test_word_longer_than_budget_gets_its_own_chunk():
+    giant = "x" * 1000
+    chunks = chunk_text(f"before {giant} after", max_tokens=10, overlap_tokens=2)
+    assert giant in chunks
+    assert chunks[0].startswith("before")
+    assert chunks[-1].endswith("after")
+    # Always makes progress, never loops on the oversized word
+    assert len(chunks) <= 3
+
+
+def test_estimate_tokens_is_about_four_characters_each():
+    assert estimate_tokens("a" * 400) == 101
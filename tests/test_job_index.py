@@ -0,0 +1,65 @@
+import pytest
+
+from job_index import JobIndex, hamming_distance, job_key, normalize_job, repersonalize, simhash
+
+DESCRIPTION = ("Design, build and operate batch and streaming data pipelines on AWS. Own the warehouse "
+               "models that analytics and finance rely on, review pull requests, mentor two junior "
+               "engineers and work with product managers to turn reporting needs into reliable datasets.")
+SENDER = {"person_name": "Steve", "company_name": "CogniCore", "person_role": "Business Development Executive"}
+
+
+def job(role="Data Engineer", experience="3 years", skills=("Python", "SQL", "Airflow"), description=DESCRIPTION):
+    return {"role": role, "experience": experience, "skills": list(skills), "description": description}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return JobIndex(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_repost_with_cosmetic_changes_has_same_fingerprint():
+    repost = job(role="DATA ENGINEER", description=DESCRIPTION.replace(", ", " , ").upper())
+    assert simhash(normalize_job(job())) == simhash(normalize_job(repost))
+
+
+def test_different_postings_are_far_apart():
+    other = job(role="Frontend Engineer", skills=("React", "TypeScript"),
+                description="Ship accessible React interfaces for our customer dashboard and design system.")
+    assert hamming_distance(simhash(normalize_job(job())), simhash(normalize_job(other))) > 6
+
+
+@pytest.mark.parametrize("role", ["Data Engineer II", "Data Engineer III", "Senior Data Engineer"])
+def test_distinct_roles_with_the_same_description_are_not_duplicates(index, role):
+    assert job_key(job()) != job_key(job(role=role))
+    assert not index.is_duplicate(job(), job(role=role))
+
+
+def test_different_experience_is_not_a_duplicate(index):
+    assert not index.is_duplicate(job(), job(experience="7 years"))
+
+
+def test_lookup_reuses_email_for_a_repost(index):
+    index.add(job(), "Hi, I'm Steve from CogniCore.", SENDER, links=["https://example.com/a"])
+    repost = job(role="data engineer", description=DESCRIPTION + " ")
+    email = index.lookup_email(repost, dict(SENDER, person_name="Dana"), links=["https://example.com/a"])
+    assert email == "Hi, I'm Dana from CogniCore."
+
+
+def test_lookup_skips_other_roles_and_other_links(index):
+    index.add(job(role="Data Engineer II"), "email", SENDER, links=["https://example.com/a"])
+    assert index.lookup_email(job(role="Data Engineer III"), SENDER) is None
+    assert index.lookup_email(job(role="Data Engineer II"), SENDER, links=["https://example.com/b"]) is None
+    assert index.lookup_email(job(role="Data Engineer II"), SENDER, links=["https://example.com/a"]) == "email"
+
+
+def test_repersonalize_matches_whole_words_only():
+    email = "Also, Alice and Al from Al's team at C++ Labs"
+    old = {"person_name": "Al", "company_name": "C++ Labs", "person_role": "CTO"}
+    new = {"person_name": "Bob", "company_name": "Rust Labs", "person_role": "CTO"}
+    assert repersonalize(email, old, new) == "Also, Alice and Bob from Bob's team at Rust Labs"
+
+
+def test_repersonalize_swaps_in_one_pass():
+    old = {"person_name": "Sam", "company_name": "Sam Co"}
+    new = {"person_name": "Sam Co", "company_name": "Other"}
+    assert repersonalize("Sam of Sam Co", old, new) == "Sam Co of Other"
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from job_queue import DONE, ERROR, QUEUED, RUNNING, JobQueue, worker_id
+
+SENDER = {"person_name": "Steve", "company_name": "CogniCore", "person_role": "BD"}
+
+
+def drain(path, name, claimed):
+    # Each worker opens its own connection, as separate processes would
+    queue = JobQueue(path)
+    worker = worker_id(name)
+    while True:
+        task = queue.claim(worker)
+        if task is None:
+            return
+        claimed.append(task["id"])
+        queue.complete(task["id"], {"jobs": []})
+
+
+def drain_process(path, name, results):
+    claimed = []
+    drain(path, name, claimed)
+    results.put(claimed)
+
+
+def test_claim_takes_oldest_first(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    first = queue.enqueue("https://example.com/1", SENDER)
+    queue.enqueue("https://example.com/2", SENDER)
+    task = queue.claim(worker_id("w"))
+    assert task["id"] == first
+    assert task["status"] == RUNNING
+    assert task["attempts"] == 1
+    assert task["sender"] == SENDER
+
+
+def test_concurrent_threads_never_claim_the_same_task(tmp_path):
+    path = str(tmp_path / "queue.sqlite3")
+    queue = JobQueue(path)
+    ids = {queue.enqueue(f"https://example.com/{i}", SENDER) for i in range(200)}
+    claimed = []
+    threads = [threading.Thread(target=drain, args=(path, f"t{i}", claimed)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(ids)
+    assert queue.counts() == {DONE: 200}
+
+
+def test_concurrent_processes_never_claim_the_same_task(tmp_path):
+    path = str(tmp_path / "queue.sqlite3")
+    queue = JobQueue(path)
+    ids = {queue.enqueue(f"https://example.com/{i}", SENDER) for i in range(100)}
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=drain_process, args=(path, f"p{i}", results)) for i in range(4)]
+    for p in processes:
+        p.start()
+    claimed = [task_id for _ in processes for task_id in results.get(timeout=60)]
+    for p in processes:
+        p.join(timeout=60)
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_requeue_dead_recovers_tasks_of_exited_workers(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    task_id = queue.enqueue("https://example.com/1", SENDER)
+    # Same host and pid as this process, but an earlier run of it
+    queue.claim(f"{socket.gethostname()}:{os.getpid()}:00000000:old")
+    live = queue.enqueue("https://example.com/2", SENDER)
+    queue.claim(worker_id("live"))
+
+    assert queue.requeue_dead() == 1
+    assert queue.get(task_id)["status"] == QUEUED
+    assert queue.get(live)["status"] == RUNNING
+
+
+def test_requeue_dead_ignores_other_hosts(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    task_id = queue.enqueue("https://example.com/1", SENDER)
+    queue.claim("some-other-host:1:00000000:w")
+    assert queue.requeue_dead() == 0
+    assert queue.get(task_id)["status"] == RUNNING
+
+
+def test_heartbeat_keeps_task_from_going_stale(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    beating = queue.enqueue("https://example.com/1", SENDER)
+    silent = queue.enqueue("https://example.com/2", SENDER)
+    worker = worker_id("w")
+    queue.claim(worker)
+    queue.claim(worker)
+    time.sleep(0.2)
+    queue.heartbeat(beating, worker)
+
+    assert queue.requeue_stale(stale_after=0.1) == 1
+    assert queue.get(beating)["status"] == RUNNING
+    assert queue.get(silent)["status"] == QUEUED
+
+
+def test_task_that_keeps_crashing_is_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    task_id = queue.enqueue("https://example.com/1", SENDER)
+    for _ in range(3):
+        queue.claim(worker_id("w"))
+        queue.requeue_stale(stale_after=-1, max_attempts=3)
+    task = queue.get(task_id)
+    assert task["status"] == ERROR
+    assert task["attempts"] == 3
@@ -0,0 +1,62 @@
+import time
+
+from llm_cache import LLMCache
+
+
+def test_make_key_depends_on_prompt_model_and_temperature():
+    key = LLMCache.make_key("prompt", "model", 0)
+    assert key == LLMCache.make_key("prompt", "model", 0)
+    assert len({key, LLMCache.make_key("prompt!", "model", 0), LLMCache.make_key("prompt", "other", 0),
+                LLMCache.make_key("prompt", "model", 0.7)}) == 4
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k") is None
+    cache.put("k", "välue")
+    assert cache.get("k") == "välue"
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": len("välue".encode("utf-8"))}
+
+
+def test_entries_survive_reopening(tmp_path):
+    LLMCache(str(tmp_path / "cache.sqlite3")).put("k", "v")
+    assert LLMCache(str(tmp_path / "cache.sqlite3")).get("k") == "v"
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_age_seconds=0.05)
+    cache.put("k", "v")
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put("a", "1")
+    time.sleep(0.01)
+    cache.put("b", "2")
+    time.sleep(0.01)
+    cache.get("a")  # now b is the least recently used
+    time.sleep(0.01)
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_size_bound_evicts_until_under_budget(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    for key in "abc":
+        cache.put(key, "x" * 10)
+        time.sleep(0.01)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("a") is None
+    cache.put("big", "y" * 30)
+    assert cache.stats()["entries"] == 0
+
+
+def test_clear(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("k", "v")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0, "bytes": 0}
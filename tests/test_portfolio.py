@@ -0,0 +1,69 @@
+import csv
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from embeddings import HashEmbeddingFunction  # noqa: E402
+from portfolio import Portfolio  # noqa: E402
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Techstack", "Links"])
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def make_portfolio(tmp_path):
+    csv_path = tmp_path / "portfolio.csv"
+
+    def make(rows):
+        write_csv(csv_path, rows)
+        return Portfolio(csv_path=str(csv_path), vectorstore_path=str(tmp_path / "vectorstore"),
+                         embedding_cache=False, backend="numpy", embedding_function=HashEmbeddingFunction())
+    return make
+
+
+ROWS = [
+    ("Python, Django, SQL", "https://example.com/django"),
+    ("React, TypeScript", "https://example.com/react"),
+    ("Kotlin, Android", "https://example.com/android"),
+]
+
+
+def test_first_sync_adds_every_row(make_portfolio):
+    portfolio = make_portfolio(ROWS)
+    assert portfolio.sync_portfolio() == {"added": 3, "updated": 0, "deleted": 0}
+    assert portfolio.collection.count() == 3
+
+
+def test_second_sync_of_the_same_csv_is_a_no_op(make_portfolio):
+    make_portfolio(ROWS).sync_portfolio()
+    portfolio = make_portfolio(ROWS)
+    embedded = []
+    embed = portfolio.collection.embedding_function
+    portfolio.collection.embedding_function = lambda texts: (embedded.extend(texts), embed(texts))[1]
+    assert portfolio.sync_portfolio() == {"added": 0, "updated": 0, "deleted": 0}
+    assert embedded == []
+
+
+def test_changed_links_removed_and_new_rows(make_portfolio):
+    make_portfolio(ROWS).sync_portfolio()
+    portfolio = make_portfolio([
+        ("Python, Django, SQL", "https://example.com/django-v2"),
+        ("Kotlin, Android", "https://example.com/android"),
+        ("Go, Kubernetes", "https://example.com/k8s"),
+    ])
+    assert portfolio.sync_portfolio() == {"added": 1, "updated": 1, "deleted": 1}
+    assert portfolio.collection.count() == 3
+    assert portfolio.query_links(["python", "django"])[0] == "https://example.com/django-v2"
+    assert portfolio.query_links(["go", "kubernetes"])[0] == "https://example.com/k8s"
+
+
+def test_repeated_techstacks_are_kept_apart(make_portfolio):
+    portfolio = make_portfolio([("Python", "https://example.com/a"), ("Python", "https://example.com/b")])
+    assert portfolio.sync_portfolio()["added"] == 2
+    assert sorted(portfolio.query_links(["python"])) == ["https://example.com/a", "https://example.com/b"]
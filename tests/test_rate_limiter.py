@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from rate_limiter import (PRIORITY_EMAIL, PRIORITY_EXTRACT, GroqScheduler, RateLimitExceeded,
+                          is_rate_limit_error)
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class APIError(Exception):
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def test_rate_limit_detection_uses_status_and_type_only():
+    assert is_rate_limit_error(RateLimited())
+    assert is_rate_limit_error(APIError("slow down", Response(429)))
+    assert not is_rate_limit_error(APIError("429 widgets in stock", Response(500)))
+    assert not is_rate_limit_error(ValueError("Error code: 429"))
+
+
+def test_extraction_is_served_before_queued_emails():
+    # 100 tokens a second; each call below needs half a second of refill
+    scheduler = GroqScheduler(requests_per_minute=600, tokens_per_minute=6000)
+    scheduler.acquire(6000)
+    order = []
+
+    def call(priority, name):
+        scheduler.acquire(50, priority)
+        order.append(name)
+
+    email = threading.Thread(target=call, args=(PRIORITY_EMAIL, "email"))
+    email.start()
+    while len(scheduler._queue) < 1:
+        time.sleep(0.001)
+    extract = threading.Thread(target=call, args=(PRIORITY_EXTRACT, "extract"))
+    extract.start()
+    email.join(5)
+    extract.join(5)
+    assert order == ["extract", "email"]
+
+
+def test_settle_charges_the_difference():
+    scheduler = GroqScheduler(tokens_per_minute=12000)
+    scheduler.acquire(1000)
+    before = scheduler.tokens.level
+    scheduler.settle(1000, 3000)
+    assert scheduler.tokens.level == pytest.approx(before - 2000)
+    scheduler.settle(1000, 200)
+    assert scheduler.tokens.level == pytest.approx(before - 1200)
+
+
+def test_call_retries_rate_limits_then_succeeds():
+    scheduler = GroqScheduler(max_retries=3, base_delay=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited()
+        return "ok"
+
+    assert scheduler.call(flaky, 10) == "ok"
+    assert len(attempts) == 3
+
+
+def test_call_gives_up_after_max_retries():
+    scheduler = GroqScheduler(max_retries=2, base_delay=0)
+    attempts = []
+
+    def always_limited():
+        attempts.append(1)
+        raise RateLimited()
+
+    with pytest.raises(RateLimitExceeded):
+        scheduler.call(always_limited, 10)
+    assert len(attempts) == 3
+
+
+def test_other_errors_are_not_retried():
+    scheduler = GroqScheduler(base_delay=0)
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        scheduler.call(broken, 10)
+    assert len(attempts) == 1
+
+
+def test_backoff_honours_retry_after():
+    scheduler = GroqScheduler(base_delay=0.5)
+    delay = scheduler.backoff(0, APIError("slow down", Response(429, {"retry-after": "2"})))
+    assert 2 <= delay <= 2.5
+    assert 0 <= scheduler.backoff(3) <= 4
@@ -0,0 +1,57 @@
+import json
+
+from structured_data import extract_job_postings
+
+
+def page(*blocks):
+    scripts = "".join(f'<script type="application/ld+json">{json.dumps(block)}</script>' for block in blocks)
+    return f"<html><head>{scripts}</head><body></body></html>"
+
+
+def posting(title, **extra):
+    return {"@type": "JobPosting", "title": title, "description": f"<p>Work as a {title}</p>", **extra}
+
+
+def test_single_posting():
+    jobs = extract_job_postings(page(posting(
+        "Data Engineer",
+        skills="Python, SQL; Airflow",
+        experienceRequirements={"@type": "OccupationalExperienceRequirements", "monthsOfExperience": 36},
+    )))
+    assert jobs == [{
+        "role": "Data Engineer",
+        "experience": "3 years",
+        "skills": ["Python", "SQL", "Airflow"],
+        "description": "Work as a Data Engineer",
+    }]
+
+
+def test_graph_document():
+    document = {
+        "@context": "https://schema.org",
+        "@graph": [
+            {"@type": "Organization", "name": "Acme"},
+            posting("Backend Engineer"),
+            posting("Frontend Engineer"),
+        ],
+    }
+    assert [job["role"] for job in extract_job_postings(page(document))] == ["Backend Engineer", "Frontend Engineer"]
+
+
+def test_top_level_list_and_list_type():
+    document = [posting("QA Engineer"), {**posting("ML Engineer"), "@type": ["JobPosting", "Thing"]}]
+    assert [job["role"] for job in extract_job_postings(page(document))] == ["QA Engineer", "ML Engineer"]
+
+
+def test_duplicates_across_blocks_are_dropped():
+    assert len(extract_job_postings(page(posting("iOS Developer"), [posting("iOS Developer")]))) == 1
+
+
+def test_postings_without_description_and_bad_json_are_skipped():
+    html = page({"@type": "JobPosting", "title": "No Description"}) + \
+        '<script type="application/ld+json">{not json</script>'
+    assert extract_job_postings(html) == []
+
+
+def test_page_without_json_ld():
+    assert extract_job_postings("<html><body><h1>Careers</h1></body></html>") == []
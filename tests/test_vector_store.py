@@ -0,0 +1,98 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vector_store import NumpyVectorStore  # noqa: E402
+
+
+def vec(*values):
+    vector = np.zeros(4, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector
+
+
+def store_with_rows(path):
+    store = NumpyVectorStore(str(path))
+    store.upsert(["a", "b", "c"], ["doc a", "doc b", "doc c"],
+                 [{"links": "a"}, {"links": "b"}, {"links": "c"}],
+                 [vec(1), vec(0, 1), vec(1, 1)])
+    return store
+
+
+def test_query_returns_exact_top_k_in_chroma_layout(tmp_path):
+    store = store_with_rows(tmp_path)
+    result = store.query(query_embeddings=[vec(1, 0.1), vec(0, 1)], n_results=2)
+    assert result["ids"] == [["a", "c"], ["b", "c"]]
+    assert result["metadatas"][0] == [{"links": "a"}, {"links": "c"}]
+    assert result["distances"][1][0] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_query_on_empty_store(tmp_path):
+    result = NumpyVectorStore(str(tmp_path)).query(query_embeddings=[vec(1)], n_results=3)
+    assert result["ids"] == [[]]
+
+
+def test_upsert_replaces_existing_rows(tmp_path):
+    store = store_with_rows(tmp_path)
+    store.upsert(["a", "d"], ["new a", "doc d"], [{"links": "a2"}, {"links": "d"}], [vec(0, 0, 1), vec(0, 0, 0, 1)])
+    assert store.count() == 4
+    assert store.get(ids=["a"])["documents"] == ["new a"]
+    assert store.query(query_embeddings=[vec(0, 0, 1)], n_results=1)["ids"] == [["a"]]
+
+
+def test_update_metadata_only(tmp_path):
+    store = store_with_rows(tmp_path)
+    store.update(["b"], metadatas=[{"links": "b2"}])
+    assert store.get(ids=["b"])["metadatas"] == [{"links": "b2"}]
+    assert store.query(query_embeddings=[vec(0, 1)], n_results=1)["ids"] == [["b"]]
+
+
+def test_delete_keeps_rows_aligned(tmp_path):
+    store = store_with_rows(tmp_path)
+    store.delete(["a", "missing"])
+    assert store.get()["ids"] == ["b", "c"]
+    assert store.query(query_embeddings=[vec(1)], n_results=1)["ids"] == [["c"]]
+
+
+def test_reload_reads_the_saved_files(tmp_path):
+    store_with_rows(tmp_path).delete(["b"])
+    reloaded = NumpyVectorStore(str(tmp_path))
+    assert reloaded.get() == {"ids": ["a", "c"], "documents": ["doc a", "doc c"],
+                              "metadatas": [{"links": "a"}, {"links": "c"}]}
+    assert reloaded.query(query_embeddings=[vec(1)], n_results=1)["ids"] == [["a"]]
+
+
+def test_editing_a_memory_mapped_store_copies_it_first(tmp_path):
+    store_with_rows(tmp_path)
+    reloaded = NumpyVectorStore(str(tmp_path))
+    assert not reloaded._matrix.flags.writeable
+    reloaded.upsert(["b"], ["doc b"], [{"links": "b"}], [vec(0, 0, 1)])
+    assert reloaded._matrix.flags.writeable
+    assert NumpyVectorStore(str(tmp_path)).query(query_embeddings=[vec(0, 0, 1)], n_results=1)["ids"] == [["b"]]
+
+
+def test_bulk_saves_once_on_exit(tmp_path, monkeypatch):
+    store = NumpyVectorStore(str(tmp_path))
+    saves = []
+    save = store._save
+    monkeypatch.setattr(store, "_save", lambda *args: (saves.append(args), save(*args)))
+    with store.bulk():
+        for i in range(5):
+            store.upsert([f"id{i}"], [f"doc {i}"], [{"links": str(i)}], [vec(i + 1, 1)])
+        store.update(["id0"], metadatas=[{"links": "zero"}])
+        store.delete(["id4"])
+        assert saves == []
+    assert len(saves) == 1
+    assert NumpyVectorStore(str(tmp_path)).count() == 4
+
+
+def test_documents_are_embedded_with_the_embedding_function(tmp_path):
+    store = NumpyVectorStore(str(tmp_path), embedding_function=lambda texts: [vec(len(t), 1) for t in texts])
+    store.upsert(["x"], ["four"], [{"links": "x"}])
+    assert store.query(query_texts=["abcd"], n_results=1)["ids"] == [["x"]]
+
+
+def test_inconsistent_files_start_empty(tmp_path):
+    store_with_rows(tmp_path)
+    np.save(tmp_path / "embeddings.npy", np.zeros((1, 4), dtype=np.float32))
+    assert NumpyVectorStore(str(tmp_path)).count() == 0
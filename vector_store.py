@@ -0,0 +1,193 @@
+# vector_store.py - Exact in-process vector search over a memory-mapped float32 matrix
+import contextlib
+import json
+import os
+import threading
+
+import numpy as np
+
+
+class NumpyVectorStore:
+    """Drop-in for the parts of a ChromaDB collection that Portfolio uses.
+
+    Embeddings are L2-normalized and kept as one contiguous float32 matrix,
+    so a batch of queries is a single matrix product followed by a partial
+    sort; results are exact rather than approximate. The matrix is saved
+    as ``embeddings.npy`` (opened memory-mapped on load) next to
+    ``index.json`` holding ids, documents and metadata. For a few thousand
+    rows this beats an HNSW index on startup, disk footprint and latency.
+
+    New rows are appended to a pending list and only stacked into the
+    matrix when it is next read. Inside ``with store.bulk():`` the files
+    are written once on exit rather than after every call.
+    """
+
+    def __init__(self, path, embedding_function=None):
+        self.path = path
+        self.embedding_function = embedding_function
+        self._lock = threading.Lock()
+        self._matrix_path = os.path.join(path, "embeddings.npy")
+        self._index_path = os.path.join(path, "index.json")
+        os.makedirs(path, exist_ok=True)
+
+        self._ids, self._documents, self._metadatas = [], [], []
+        self._matrix = None
+        self._pending = []
+        self._bulk = 0
+        if os.path.exists(self._matrix_path) and os.path.exists(self._index_path):
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            matrix = np.load(self._matrix_path, mmap_mode="r")
+            if len(index["ids"]) == matrix.shape[0]:
+                self._ids, self._documents, self._metadatas = index["ids"], index["documents"], index["metadatas"]
+                self._matrix = matrix
+            else:
+                print(f"⚠️ Vector store at {path} is inconsistent, starting empty")
+        self._positions = {row_id: i for i, row_id in enumerate(self._ids)}
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _embed(self, texts):
+        if self.embedding_function is None:
+            raise ValueError("No embedding function; pass embeddings explicitly")
+        return self.embedding_function(list(texts))
+
+    @contextlib.contextmanager
+    def bulk(self):
+        """Defer writing the files until the outermost ``bulk()`` block exits"""
+        with self._lock:
+            self._bulk += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._bulk -= 1
+                if self._bulk == 0:
+                    self._save()
+
+    def _rows(self):
+        """The full matrix, with pending rows stacked on (call under the lock)"""
+        if self._pending:
+            parts = ([] if self._matrix is None else [self._matrix]) + [np.stack(self._pending)]
+            self._matrix = np.ascontiguousarray(np.vstack(parts))
+            self._pending = []
+        return self._matrix
+
+    def count(self):
+        return len(self._ids)
+
+    def get(self, ids=None, include=None, limit=None, offset=0):
+        with self._lock:
+            if ids is None:
+                end = None if limit is None else offset + limit
+                positions = range(len(self._ids))[offset:end]
+            else:
+                positions = [self._positions[row_id] for row_id in ids if row_id in self._positions]
+            return {
+                "ids": [self._ids[i] for i in positions],
+                "documents": [self._documents[i] for i in positions],
+                "metadatas": [self._metadatas[i] for i in positions],
+            }
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        if embeddings is None:
+            embeddings = self._embed(documents)
+        vectors = self._normalize(embeddings)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            for row_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                position = self._positions.get(row_id)
+                if position is None:
+                    self._positions[row_id] = len(self._ids)
+                    self._ids.append(row_id)
+                    self._documents.append(document)
+                    self._metadatas.append(metadata)
+                    self._pending.append(vector)
+                    continue
+                self._documents[position] = document
+                self._metadatas[position] = metadata
+                stored = 0 if self._matrix is None else self._matrix.shape[0]
+                if position >= stored:
+                    self._pending[position - stored] = vector
+                else:
+                    if not self._matrix.flags.writeable:
+                        # Loaded memory-mapped read-only; copy once before editing
+                        self._matrix = np.array(self._matrix)
+                    self._matrix[position] = vector
+            self._save_unless_bulk()
+
+    def update(self, ids, metadatas=None, documents=None, embeddings=None):
+        if documents is not None or embeddings is not None:
+            current = self.get(ids=ids)
+            self.upsert(ids, documents or current["documents"], metadatas or current["metadatas"], embeddings)
+            return
+        with self._lock:
+            for row_id, metadata in zip(ids, metadatas or []):
+                position = self._positions.get(row_id)
+                if position is not None:
+                    self._metadatas[position] = metadata
+            self._save_unless_bulk(matrix=False)
+
+    def delete(self, ids):
+        with self._lock:
+            drop = {self._positions[row_id] for row_id in ids if row_id in self._positions}
+            if not drop:
+                return
+            keep = [i for i in range(len(self._ids)) if i not in drop]
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._matrix = np.ascontiguousarray(self._rows()[keep])
+            self._positions = {row_id: i for i, row_id in enumerate(self._ids)}
+            self._save_unless_bulk()
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=10, include=None):
+        """Exact top-``n_results`` by cosine similarity, in Chroma's result layout"""
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts)
+        queries = self._normalize(query_embeddings)
+        with self._lock:
+            matrix, ids, documents, metadatas = self._rows(), self._ids, self._documents, self._metadatas
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        k = min(n_results, len(ids))
+        if k == 0:
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return result
+
+        scores = queries @ matrix.T
+        # argpartition finds the k best per row in linear time; only those get sorted
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for row, row_scores in zip(top.tolist(), top_scores.tolist()):
+            result["ids"].append([ids[i] for i in row])
+            result["documents"].append([documents[i] for i in row])
+            result["metadatas"].append([metadatas[i] for i in row])
+            result["distances"].append([1.0 - score for score in row_scores])
+        return result
+
+    def _save_unless_bulk(self, matrix=True):
+        if not self._bulk:
+            self._save(matrix)
+
+    def _save(self, matrix=True):
+        # Write to temp files and swap them in, so readers never see half a file
+        if matrix and self._rows() is not None:
+            tmp = self._matrix_path + ".tmp.npy"
+            np.save(tmp, self._matrix)
+            os.replace(tmp, self._matrix_path)
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "documents": self._documents, "metadatas": self._metadatas}, f)
+        os.replace(tmp, self._index_path)